@@ -1,16 +1,26 @@
 import sys
-import json
 import os
-import requests
 import logging
+from weather import WeatherCache, WeatherClient, ForecastPrefetcher, normalize_city
+from models import CourseRepository, Course, Grade, DAY_CODES
+from decision_engine import CourseInput, SEVERITY, recommend
+from images import ImageLoader, PixmapCache
+from qt_models import (
+    CourseListModel, GradeTableModel, TodayCoursesModel, TodayCourseDelegate, COURSE_ID_ROLE, SORT_ROLE
+)
+from storage import (
+    BackgroundWriter, SqliteWriter, serialize_data, load_with_journal, journal_path_for,
+    load_sqlite, migrate_json_to_sqlite, read_binary_cache, migrate_data, SCHEMA_VERSION, JournalGapError,
+    ShardedWriter, load_sharded, migrate_json_to_sharded
+)
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QLineEdit, QPushButton, QListWidget, QComboBox,
-    QCheckBox, QMessageBox, QListWidgetItem, QSpinBox, QStackedWidget,
-    QFormLayout, QDateEdit, QFileDialog, QGroupBox, QScrollArea
+    QLabel, QLineEdit, QPushButton, QListView, QTableView, QComboBox,
+    QCheckBox, QMessageBox, QSpinBox, QStackedWidget, QAbstractItemView, QHeaderView,
+    QFormLayout, QDateEdit, QFileDialog, QGroupBox
 )
-from PyQt5.QtCore import Qt, QDate
-from PyQt5.QtGui import QFont, QPixmap
+from PyQt5.QtCore import Qt, QDate, QObject, QRunnable, QThreadPool, QTimer, QSortFilterProxyModel, pyqtSignal
+from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import QGraphicsOpacityEffect
 
 # Włączanie obsługi wysokiego DPI
@@ -19,6 +29,132 @@ QApplication.setAttribute(Qt.AA_EnableHighDpiScaling)
 # Konfiguracja logowania
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+
+# Postać anime w motywie Sakura Pink (rozmiar w pikselach logicznych)
+ANIME_CHARACTER_PATH = "anime_character.png"
+ANIME_CHARACTER_WIDTH = 300
+ANIME_CHARACTER_HEIGHT = 450
+
+# Rozmiary zdjęcia profilowego: w menu i na stronie profilu
+PROFILE_PIC_SIZE = 80
+PROFILE_PIC_EDIT_SIZE = 150
+
+# Teksty okna analizy dla kodów zwracanych przez decision_engine
+WEATHER_TEXTS = {
+    "rain": "Uwaga: Dzisiaj pada. Rozważ zabranie parasola lub ubranie się odpowiednio do pogody.",
+    "clear": "Pogoda jest ładna, to dobry dzień na zajęcia!",
+    "clouds": "Dzisiaj jest pochmurno, ale to nie powinno wpłynąć na Twoją obecność.",
+    "error": "Błąd analizy pogody."
+}
+# To samo dla innego dnia niż dziś (pogoda według prognozy); {date} - wybrany dzień
+FORECAST_TEXTS = {
+    "rain": "Uwaga: na {date} prognozowany jest deszcz. Rozważ zabranie parasola lub ubranie się odpowiednio do pogody.",
+    "clear": "Prognoza na {date} jest ładna, to dobry dzień na zajęcia!",
+    "clouds": "Na {date} prognozowane jest zachmurzenie, ale to nie powinno wpłynąć na Twoją obecność.",
+    "error": "Błąd analizy pogody."
+}
+MOOD_TEXTS = {
+    "very_poor": ("red", "Twoje samopoczucie jest bardzo słabe. Jeśli to możliwe, rozważ pozostanie w domu i odpoczynek."),
+    "poor": ("orange", "Twoje samopoczucie jest słabe. Jeśli przedmioty nie są obowiązkowe, możesz rozważyć nieobecność."),
+    "ok": (None, "Twoje samopoczucie jest w porządku. Powinieneś być w stanie pójść na zajęcia."),
+    "great": ("green", "Twoje samopoczucie jest bardzo dobre! To świetny dzień na naukę.")
+}
+REASON_TEXTS = {
+    "mandatory": "Obowiązkowe: Musisz iść na zajęcia",
+    "optional": "Nieobowiązkowe: Możesz rozważyć nieobecność",
+    "absences_critical": "Uwaga! Masz już prawie wyczerpany limit nieobecności",
+    "absences_half": "Masz wykorzystaną ponad połowę nieobecności",
+    "absences_ok": "Masz jeszcze sporo nieobecności do wykorzystania",
+    "grades_good": "Twoje oceny są dobre, możesz sobie pozwolić na nieobecność",
+    "grades_average": "Twoje oceny są średnie, lepiej idź na zajęcia",
+    "grades_poor": "Twoje oceny są słabe, koniecznie idź na zajęcia",
+    "trend_down": "Ostatnie oceny są coraz niższe",
+    "trend_up": "Ostatnie oceny są coraz wyższe",
+    "no_numeric_grades": "Brak ocen liczbowych do analizy",
+    "no_grades": "Brak ocen do analizy"
+}
+VERDICT_TEXTS = {
+    "must_attend": "musisz iść",
+    "should_attend": "lepiej idź",
+    "may_skip": "możesz opuścić"
+}
+OVERALL_TEXTS = {
+    "must_attend": ("red", "Musisz iść na zajęcia (przedmioty obowiązkowe)"),
+    "stay_home": ("orange", "Zostań w domu i odpocznij"),
+    "may_stay_home": ("orange", "Możesz zostać w domu, ale rozważ pójście na zajęcia"),
+    "attend": ("green", "Idź na zajęcia")
+}
+
+
+class WeatherSignals(QObject):
+    # Sygnały przekazujące wynik z wątku roboczego do wątku GUI
+    finished = pyqtSignal(int, str, int, object)  # id żądania, miasto, kod HTTP, dane JSON
+    failed = pyqtSignal(int, str)  # id żądania, opis błędu
+
+
+class WeatherWorker(QRunnable):
+    # Pobieranie pogody w puli wątków, żeby nie blokować interfejsu;
+    # fetch to funkcja klienta zwracająca (kod HTTP, dane JSON)
+    def __init__(self, request_id, city, fetch):
+        super().__init__()
+        self.setAutoDelete(False)  # Referencję trzyma aplikacja do czasu odebrania wyniku
+        self.request_id = request_id
+        self.city = city
+        self.fetch = fetch
+        self.cancelled = False
+        self.signals = WeatherSignals()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        if self.cancelled:
+            self.signals.failed.emit(self.request_id, "Anulowano")
+            return
+        try:
+            status_code, data = self.fetch(self.city)
+        except Exception as e:
+            self.signals.failed.emit(self.request_id, str(e))
+            return
+        self.signals.finished.emit(self.request_id, self.city, status_code, data)
+
+
+class Debouncer(QObject):
+    # Wywołuje callback dopiero po ustaniu serii zdarzeń (np. pisania),
+    # pośrednie wywołania są porzucane, a przekazywane są ostatnie argumenty
+    def __init__(self, callback, delay_ms=500, parent=None):
+        super().__init__(parent)
+        self.callback = callback
+        self.pending_args = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.fire)
+
+    def trigger(self, *args):
+        self.pending_args = args
+        self.timer.start()  # Ponowny start przesuwa termin wywołania
+
+    def flush(self):
+        # Natychmiastowe wykonanie oczekującego wywołania (np. przy zamykaniu okna)
+        if self.timer.isActive():
+            self.timer.stop()
+            self.fire()
+
+    def cancel(self):
+        self.timer.stop()
+        self.pending_args = None
+
+    def is_pending(self):
+        return self.timer.isActive()
+
+    def fire(self):
+        args = self.pending_args
+        self.pending_args = None
+        if args is not None:
+            self.callback(*args)
+
+
 class CourseManagerApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -27,7 +163,13 @@ class CourseManagerApp(QMainWindow):
         self.setWindowFlags(self.windowFlags() & ~Qt.WindowMaximizeButtonHint)  # Wyłączenie maksymalizacji
 
         # Inicjalizacja danych
-        self.courses = []
+        self.course_repository = CourseRepository()
+        self.course_model = CourseListModel(self.course_repository, self)  # Wspólny model list kursów
+        self.pixmap_cache = PixmapCache()
+        # Dekodowanie obrazów w tle, w rozdzielczości potrzebnej do wyświetlenia
+        self.image_loader = ImageLoader(self.pixmap_cache, self)
+        self.image_loader.ready.connect(self.on_image_ready)
+        self.image_loader.failed.connect(self.on_image_failed)
         self.current_style = "Windows XP"
         self.user_data = {
             "name": "",
@@ -35,7 +177,38 @@ class CourseManagerApp(QMainWindow):
             "city": ""
         }
         self.weather_data = {}
+        self.weather_cache = WeatherCache()
+        self.weather_client = WeatherClient(self.weather_cache)  # Dostawca wybierany przez WEATHER_PROVIDER
+        logging.info(f"Dostawca pogody: {type(self.weather_client.provider).__name__}")
+        self.forecast = ForecastPrefetcher(self.weather_client)
+        self.forecast_request_id = 0
+        self.forecast_workers = {}  # Pobierania prognozy w toku: id -> WeatherWorker
+        self.weather_pool = QThreadPool()
+        self.weather_pool.setMaxThreadCount(2)
+        self.weather_request_id = 0  # Id najnowszego żądania pogody
+        self.weather_workers = {}  # Żądania w toku: id -> WeatherWorker
         self.editing_grade_index = None  # Śledzenie indeksu edytowanej oceny
+        # Zapis w tle: pojedyncze zmiany trafiają do dziennika, pełna migawka
+        # jest łączona w jeden zapis po chwili bezczynności
+        # COURSE_STORAGE=sqlite przełącza na bazę SQLite (course_data.db),
+        # COURSE_STORAGE=sharded na osobne pliki kursów w katalogu course_data/
+        self.storage_backend = os.getenv("COURSE_STORAGE", "json").lower()
+        if self.storage_backend == "sqlite":
+            self.data_path = "course_data.db"
+            if not os.path.exists(self.data_path) and os.path.exists("course_data.json"):
+                migrate_json_to_sqlite("course_data.json", self.data_path)
+            self.data_writer = SqliteWriter(self.data_path)
+        elif self.storage_backend == "sharded":
+            self.data_path = "course_data"
+            if not os.path.exists(self.data_path) and os.path.exists("course_data.json"):
+                migrate_json_to_sharded("course_data.json", self.data_path)
+            self.data_writer = ShardedWriter(self.data_path)
+        else:
+            self.data_path = "course_data.json"
+            self.data_writer = BackgroundWriter(self.data_path)
+        self.journal_seq = 0  # Numer ostatniej zmiany zapisanej w dzienniku
+        self.cache_stale = True  # Czy migawka binarna wymaga zapisu przy zamykaniu (load_data zeruje)
+        self.save_debouncer = Debouncer(self.write_data, 300, self)
         self.load_data()
 
         # Główne widgety
@@ -49,6 +222,10 @@ class CourseManagerApp(QMainWindow):
         self.apply_style(self.current_style)
         self.update_home_page()  # Wywołanie po załadowaniu danych
 
+    @property
+    def courses(self):
+        return self.course_repository.courses
+
     def init_ui(self):
         # Lewe menu
         self.create_left_menu()
@@ -61,7 +238,7 @@ class CourseManagerApp(QMainWindow):
 
         # Postać anime (nad tłem main_area, pod UI)
         self.anime_character_label = QLabel(self.main_area)
-        self.anime_character_label.setFixedSize(300, 450)  # Powiększona postać
+        self.anime_character_label.setFixedSize(ANIME_CHARACTER_WIDTH, ANIME_CHARACTER_HEIGHT)  # Powiększona postać
         self.anime_character_label.setStyleSheet("background: transparent;")
         self.anime_character_label.setAttribute(Qt.WA_TransparentForMouseEvents)
         self.anime_character_label.lower()  # Pod UI
@@ -104,7 +281,7 @@ class CourseManagerApp(QMainWindow):
         self.main_layout.addWidget(self.main_area, stretch=4)
 
         # Aktualizacja danych
-        self.update_courses_list()
+        self.update_grades_form()
         self.update_anime_character()
 
     def create_left_menu(self):
@@ -117,7 +294,7 @@ class CourseManagerApp(QMainWindow):
         # Logo/avatar
         self.profile_pic_label = QLabel()
         self.profile_pic_label.setObjectName("profile_pic_label")
-        self.profile_pic_label.setFixedSize(80, 80)
+        self.profile_pic_label.setFixedSize(PROFILE_PIC_SIZE, PROFILE_PIC_SIZE)
         self.profile_pic_label.setAlignment(Qt.AlignCenter)
         self.update_profile_pic()
 
@@ -168,9 +345,17 @@ class CourseManagerApp(QMainWindow):
         self.mood_input.setMaximum(10)
         self.mood_input.setFixedWidth(60)
 
+        # Dzień analizy - dla kolejnych dni pogoda pochodzi z pobranej wcześniej prognozy
+        self.analysis_date_input = QDateEdit()
+        self.analysis_date_input.setCalendarPopup(True)
+        self.analysis_date_input.setDate(QDate.currentDate())
+        self.analysis_date_input.setDateRange(QDate.currentDate(), QDate.currentDate().addDays(6))
+
         mood_layout.addWidget(QLabel("Samopoczucie (1-10):"))
         mood_layout.addWidget(self.mood_input)
         mood_layout.addStretch()
+        mood_layout.addWidget(QLabel("Dzień zajęć:"))
+        mood_layout.addWidget(self.analysis_date_input)
 
         mood_group.setLayout(mood_layout)
         home_layout.addWidget(mood_group)
@@ -194,20 +379,28 @@ class CourseManagerApp(QMainWindow):
         self.today_courses_group = QGroupBox("Dzisiejsze zajęcia")
         today_courses_layout = QVBoxLayout()
 
-        # QScrollArea dla przewijania
-        self.today_courses_scroll = QScrollArea()
-        self.today_courses_scroll.setWidgetResizable(True)
-        self.today_courses_scroll.setMinimumHeight(200)
-        self.today_courses_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        self.today_courses_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-
-        self.today_courses_widget = QWidget()
-        self.today_courses_widget.setStyleSheet("background: transparent;")  # Przezroczyste tło
-        self.today_courses_layout = QVBoxLayout()
-        self.today_courses_widget.setLayout(self.today_courses_layout)
-        self.today_courses_scroll.setWidget(self.today_courses_widget)
-
-        today_courses_layout.addWidget(self.today_courses_scroll)
+        # Lista rysowana przez delegata: bez widżetów na kurs, rysowane są tylko widoczne wiersze
+        self.today_courses_model = TodayCoursesModel(
+            self.course_model, QDate.currentDate().dayOfWeek() - 1, self
+        )
+        self.today_courses_view = QListView()
+        self.today_courses_view.setModel(self.today_courses_model)
+        self.today_courses_view.setItemDelegate(TodayCourseDelegate(self.today_courses_view))
+        self.today_courses_view.setUniformItemSizes(True)
+        self.today_courses_view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.today_courses_view.setMouseTracking(True)
+        self.today_courses_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.today_courses_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.today_courses_view.setMinimumHeight(200)
+
+        self.today_courses_empty_label = QLabel("Brak zajęć na dziś")
+        self.today_courses_empty_label.setStyleSheet("background: transparent;")  # Przezroczyste tło
+        for signal in (self.today_courses_model.modelReset, self.today_courses_model.rowsInserted,
+                       self.today_courses_model.rowsRemoved):
+            signal.connect(self.update_today_courses_empty)
+
+        today_courses_layout.addWidget(self.today_courses_empty_label)
+        today_courses_layout.addWidget(self.today_courses_view)
         self.today_courses_group.setLayout(today_courses_layout)
         home_layout.addWidget(self.today_courses_group)
 
@@ -221,7 +414,7 @@ class CourseManagerApp(QMainWindow):
         # Profile picture
         self.profile_pic_edit_label = QLabel()
         self.profile_pic_edit_label.setObjectName("profile_pic_edit_label")
-        self.profile_pic_edit_label.setFixedSize(150, 150)
+        self.profile_pic_edit_label.setFixedSize(PROFILE_PIC_EDIT_SIZE, PROFILE_PIC_EDIT_SIZE)
         self.profile_pic_edit_label.setAlignment(Qt.AlignCenter)
         self.update_profile_pic_edit()
 
@@ -246,7 +439,10 @@ class CourseManagerApp(QMainWindow):
 
         self.city_input = QLineEdit()
         self.city_input.setText(self.user_data["city"])
-        self.city_input.textChanged.connect(self.update_city)
+        # Zapis i zapytanie o pogodę dopiero po zakończeniu pisania
+        self.city_debouncer = Debouncer(self.update_city, 700, self)
+        self.city_input.textChanged.connect(self.city_debouncer.trigger)
+        self.city_input.editingFinished.connect(self.city_debouncer.flush)
 
         form.addRow("Imię:", name_layout)
         form.addRow("Miasto:", self.city_input)
@@ -275,7 +471,7 @@ class CourseManagerApp(QMainWindow):
 
         self.days_checkboxes = {}
         days_pl = ["Poniedziałek", "Wtorek", "Środa", "Czwartek", "Piątek", "Sobota", "Niedziela"]
-        days_short = ["pon", "wt", "śr", "czw", "pt", "sob", "niedz"]
+        days_short = DAY_CODES
 
         days_layout = QHBoxLayout()
         left_column = QVBoxLayout()
@@ -328,8 +524,10 @@ class CourseManagerApp(QMainWindow):
         courses_layout.addWidget(self.course_form)
 
         # Courses list
-        self.courses_list = QListWidget()
-        self.courses_list.itemClicked.connect(self.load_course_for_edit)
+        self.courses_list = QListView()
+        self.courses_list.setModel(self.course_model)
+        self.courses_list.setUniformItemSizes(True)  # Bez mierzenia każdego wiersza przy tysiącach kursów
+        self.courses_list.clicked.connect(self.load_course_for_edit)
         courses_layout.addWidget(self.courses_list)
 
     def create_grades_page(self):
@@ -339,6 +537,11 @@ class CourseManagerApp(QMainWindow):
 
         # Course selection
         self.course_combo = QComboBox()
+        self.course_combo.setModel(self.course_model)
+        self.course_combo.view().setUniformItemSizes(True)
+        # Szerokość pola niezależna od zawartości - bez przeglądania wszystkich nazw
+        self.course_combo.setSizeAdjustPolicy(QComboBox.AdjustToMinimumContentsLengthWithIcon)
+        self.course_combo.setMinimumContentsLength(20)
         self.course_combo.currentIndexChanged.connect(self.update_grades_form)
         grades_layout.addWidget(QLabel("Wybierz przedmiot:"))
         grades_layout.addWidget(self.course_combo)
@@ -381,8 +584,22 @@ class CourseManagerApp(QMainWindow):
         grades_layout.addWidget(self.grade_form)
 
         # Grades list
-        self.grades_list = QListWidget()
-        self.grades_list.itemSelectionChanged.connect(self.on_grade_selection_changed)
+        # Oceny wybranego kursu: model ze stronicowaniem, sortowanie przez proxy bez zmiany kolejności ocen
+        self.grade_model = GradeTableModel(self)
+        self.grade_proxy = QSortFilterProxyModel(self)
+        self.grade_proxy.setSourceModel(self.grade_model)
+        self.grade_proxy.setSortRole(SORT_ROLE)
+        self.grades_list = QTableView()
+        self.grades_list.setModel(self.grade_proxy)
+        self.grades_list.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.grades_list.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.grades_list.verticalHeader().hide()
+        self.grades_list.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.grades_list.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.grades_list.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)  # Kolejność dodania
+        self.grades_list.horizontalHeader().sortIndicatorChanged.connect(lambda *args: self.grade_model.fetch_all())
+        self.grades_list.setSortingEnabled(True)
+        self.grades_list.selectionModel().selectionChanged.connect(self.on_grade_selection_changed)
         grades_layout.addWidget(self.grades_list)
 
         # Buttons for edit and remove
@@ -398,31 +615,43 @@ class CourseManagerApp(QMainWindow):
         grades_layout.addLayout(buttons_layout)
 
     def update_anime_character(self):
-        if self.current_style == "Sakura Pink" and os.path.exists("anime_character.png"):
-            pixmap = QPixmap("anime_character.png")
-            if pixmap.isNull():
-                logging.error("Nie udało się załadować anime_character.png")
-                self.anime_character_label.hide()
-                return
-            pixmap = pixmap.scaled(300, 450, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            self.anime_character_label.setPixmap(pixmap)
-            self.anime_character_label.setGraphicsEffect(None)  # Pełna nieprzezroczystość
-            # Pozycjonowanie w prawym dolnym rogu
-            x_pos = self.main_area.width() - 300 - 10  # 300 pikseli szerokości
-            y_pos = self.main_area.height() - 450 - 50  # 450 pikseli wysokości, 50 na przycisk
-            self.anime_character_label.move(x_pos, y_pos)
-            self.anime_character_label.lower()  # Pod UI
-            self.stacked_widget.raise_()  # UI nad postacią
-            self.analyze_btn.raise_()  # Przycisk nad postacią
-            self.anime_character_label.show()
-            logging.info(f"Postać anime załadowana, pozycja: ({x_pos}, {y_pos}), rozmiar main_area: ({self.main_area.width()}, {self.main_area.height()})")
-        else:
-            self.anime_character_label.hide()
-            self.anime_character_label.setGraphicsEffect(None)
+        # Obraz z pamięci podręcznej albo wczytywany w tle (wynik w on_image_ready);
+        # dekodowanie tylko przy zmianie pliku, rozmiaru lub DPI
+        if self.current_style != "Sakura Pink" or not os.path.exists(ANIME_CHARACTER_PATH):
+            self.image_loader.forget("anime")
+            self.hide_anime_character()
+            return
+        pixmap = self.image_loader.request("anime", ANIME_CHARACTER_PATH, ANIME_CHARACTER_WIDTH,
+                                           ANIME_CHARACTER_HEIGHT, self.devicePixelRatioF())
+        if pixmap is not None:
+            self.show_anime_character(pixmap)
+
+    def hide_anime_character(self):
+        if not self.anime_character_label.isHidden():
             logging.info("Postać anime ukryta (motyw Windows XP lub brak pliku)")
+        self.anime_character_label.hide()
+        self.anime_character_label.setGraphicsEffect(None)
+
+    def show_anime_character(self, pixmap):
+        current = self.anime_character_label.pixmap()
+        if current is None or current.cacheKey() != pixmap.cacheKey():
+            self.anime_character_label.setPixmap(pixmap)
+        self.anime_character_label.setGraphicsEffect(None)  # Pełna nieprzezroczystość
+        self.position_anime_character()
+        self.anime_character_label.show()
+
+    def position_anime_character(self):
+        # Tylko przesunięcie w prawy dolny róg (zmiana rozmiaru okna) - bez wczytywania obrazu
+        x_pos = self.main_area.width() - ANIME_CHARACTER_WIDTH - 10
+        y_pos = self.main_area.height() - ANIME_CHARACTER_HEIGHT - 50  # 50 pikseli na przycisk
+        self.anime_character_label.move(x_pos, y_pos)
+        self.anime_character_label.lower()  # Pod UI
+        self.stacked_widget.raise_()  # UI nad postacią
+        self.analyze_btn.raise_()  # Przycisk nad postacią
 
     def resizeEvent(self, event):
-        self.update_anime_character()
+        if not self.anime_character_label.isHidden():
+            self.position_anime_character()
         super().resizeEvent(event)
 
     def toggle_fullscreen(self):
@@ -438,7 +667,7 @@ class CourseManagerApp(QMainWindow):
             QMessageBox.warning(self, "Błąd", "Imię nie może być puste!")
             return
         self.user_data["name"] = name
-        self.save_data()
+        self.record_change("set_user", key="name", value=name)
         self.update_home_page()
         QMessageBox.information(self, "Sukces", f"Imię '{name}' zostało zapisane!")
         logging.info(f"Zapisano imię: {name}")
@@ -451,40 +680,53 @@ class CourseManagerApp(QMainWindow):
         self.update_today_courses()
 
     def update_profile_pic(self):
-        try:
-            if self.user_data.get("profile_pic") and os.path.exists(self.user_data["profile_pic"]):
-                pixmap = QPixmap(self.user_data["profile_pic"])
-                size = min(pixmap.width(), pixmap.height())
-                pixmap = pixmap.copy((pixmap.width() - size) // 2, (pixmap.height() - size) // 2, size, size)
-                pixmap = pixmap.scaled(80, 80, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                self.profile_pic_label.setPixmap(pixmap)
-            else:
-                self.profile_pic_label.setText("Brak zdjęcia")
-        except Exception as e:
-            logging.error(f"Błąd aktualizacji zdjęcia profilowego: {e}")
-            self.profile_pic_label.setText("Błąd zdjęcia")
+        self.load_profile_pic("profile_pic", self.profile_pic_label, PROFILE_PIC_SIZE)
 
     def update_profile_pic_edit(self):
-        try:
-            if self.user_data.get("profile_pic") and os.path.exists(self.user_data["profile_pic"]):
-                pixmap = QPixmap(self.user_data["profile_pic"])
-                size = min(pixmap.width(), pixmap.height())
-                pixmap = pixmap.copy((pixmap.width() - size) // 2, (pixmap.height() - size) // 2, size, size)
-                pixmap = pixmap.scaled(150, 150, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                self.profile_pic_edit_label.setPixmap(pixmap)
-            else:
-                self.profile_pic_edit_label.setText("Brak zdjęcia")
-        except Exception as e:
-            logging.error(f"Błąd aktualizacji zdjęcia profilowego (edycja): {e}")
+        self.load_profile_pic("profile_pic_edit", self.profile_pic_edit_label, PROFILE_PIC_EDIT_SIZE)
+
+    def load_profile_pic(self, target, label, size):
+        # Środkowy kwadrat zdjęcia dekodowany w tle od razu w rozmiarze etykiety (zdjęcia z telefonu nie blokują GUI)
+        path = self.user_data.get("profile_pic")
+        if not path or not os.path.exists(path):
+            self.image_loader.forget(target)
+            label.setText("Brak zdjęcia")
+            return
+        pixmap = self.image_loader.request(target, path, size, size, self.devicePixelRatioF(), crop=True)
+        if pixmap is not None:
+            label.setPixmap(pixmap)
+        elif label.pixmap() is None or label.pixmap().isNull():
+            label.setText("Wczytywanie...")
+
+    def on_image_ready(self, target, pixmap):
+        if target == "anime":
+            if self.current_style == "Sakura Pink":
+                self.show_anime_character(pixmap)
+        elif target == "profile_pic":
+            self.profile_pic_label.setPixmap(pixmap)
+        elif target == "profile_pic_edit":
+            self.profile_pic_edit_label.setPixmap(pixmap)
+
+    def on_image_failed(self, target, message):
+        logging.error(f"Nie udało się wczytać obrazu ({target}): {message}")
+        if target == "anime":
+            self.hide_anime_character()
+        elif target == "profile_pic":
+            self.profile_pic_label.setText("Błąd zdjęcia")
+        elif target == "profile_pic_edit":
             self.profile_pic_edit_label.setText("Błąd zdjęcia")
 
-    def update_city(self):
+    def update_city(self, *args):
         city = self.city_input.text().strip()
+        if city == self.user_data.get("city", "").strip():
+            return  # Bez zmian, nie ma czego zapisywać ani pobierać
         self.user_data["city"] = city
-        self.save_data()
+        self.record_change("set_user", key="city", value=city)
         self.update_weather()
 
     def update_weather(self):
+        # Nowe żądanie zastępuje wszystkie poprzednie
+        self.cancel_weather_requests()
         city = self.user_data.get("city", "").strip()
         if not city:
             self.weather_city_label.setText("Nie ustawiono miasta")
@@ -493,151 +735,178 @@ class CourseManagerApp(QMainWindow):
             return
 
         self.weather_city_label.setText(f"Pogoda w: {city}")
+        self.prefetch_forecast(city)
 
-        try:
-            api_key = os.getenv("OPENWEATHERMAP_API_KEY", "dda747e2109d0a5935b8f8f418d84b41")
-            base_url = "http://api.openweathermap.org/data/2.5/weather"
-            params = {
-                "q": city,
-                "appid": api_key,
-                "units": "metric",
-                "lang": "pl"
-            }
+        # Najpierw pokazujemy dane z pamięci podręcznej, nieświeże odświeżamy w tle
+        cached, fresh = self.weather_client.cached(city)
+        if cached is not None:
+            try:
+                self.show_weather(cached)
+            except (KeyError, IndexError, TypeError, AttributeError) as e:
+                # Wpis o niepełnym kształcie (np. zapisany przez starszą wersję) jest usuwany i pobierany od nowa
+                logging.error(f"Uszkodzony wpis pamięci podręcznej pogody dla {city}: {e}")
+                self.weather_cache.discard(city)
+                cached, fresh = None, False
+        if cached is not None:
+            if fresh:
+                logging.info(f"Pogoda dla {city} z pamięci podręcznej")
+                return
+        else:
+            self.weather_info_label.setText("Pobieranie pogody...")
+            self.weather_temp_label.setText("")
+
+        self.weather_request_id += 1
+        worker = WeatherWorker(self.weather_request_id, city, self.weather_client.fetch_current)
+        worker.signals.finished.connect(self.on_weather_finished)
+        worker.signals.failed.connect(self.on_weather_failed)
+        self.weather_workers[worker.request_id] = worker
+        self.weather_pool.start(worker)
+
+    def show_weather(self, data):
+        self.weather_data = data
+        temp = data["main"]["temp"]
+        desc = data["weather"][0]["description"].capitalize()
 
-            response = requests.get(base_url, params=params, timeout=5)
-            data = response.json()
+        self.weather_info_label.setText(desc)
+        self.weather_temp_label.setText(f"Temperatura: {temp}°C")
 
-            if response.status_code == 200:
-                self.weather_data = data
-                temp = data["main"]["temp"]
-                desc = data["weather"][0]["description"].capitalize()
+    def current_weather(self):
+        # Dane pogodowe dla bieżącego miasta (także nieświeże) albo pusty słownik
+        city = self.user_data.get("city", "").strip()
+        if not city:
+            return {}
+        cached, _ = self.weather_cache.get(city)
+        return cached or {}
+
+    def weather_for_date(self, date):
+        # Na dziś aktualna pogoda, na kolejne dni prognoza z pamięci (bez zapytań sieciowych)
+        if date == QDate.currentDate():
+            return self.current_weather()
+        city = self.user_data.get("city", "").strip()
+        if not city:
+            return {}
+        return self.forecast.weather_for(city, date.toString("yyyy-MM-dd")) or {}
 
-                self.weather_info_label.setText(desc)
-                self.weather_temp_label.setText(f"Temperatura: {temp}°C")
+    def prefetch_forecast(self, city):
+        # Jedno pobieranie prognozy na miasto naraz; pobieranie dla poprzedniego miasta nie blokuje nowego
+        key = normalize_city(city)
+        if any(normalize_city(worker.city) == key for worker in self.forecast_workers.values()):
+            return
+        if not self.forecast.needs_refresh(city):
+            return
+        self.forecast_request_id += 1
+        worker = WeatherWorker(self.forecast_request_id, city, self.forecast.prefetch)
+        worker.signals.finished.connect(self.on_forecast_finished)
+        worker.signals.failed.connect(self.on_forecast_failed)
+        self.forecast_workers[worker.request_id] = worker
+        self.weather_pool.start(worker)
+
+    def on_forecast_finished(self, request_id, city, status_code, data):
+        self.forecast_workers.pop(request_id, None)
+        if status_code == 200:
+            logging.info(f"Pobrano prognozę dla {city}, dni: {self.forecast.available_dates(city)}")
+        else:
+            logging.warning(f"Błąd pobierania prognozy dla {city}: {data.get('message', status_code)}")
+        self.recheck_forecast(city)
+
+    def on_forecast_failed(self, request_id, error):
+        worker = self.forecast_workers.pop(request_id, None)
+        logging.error(f"Błąd pobierania prognozy: {error}")
+        if worker is not None:
+            self.recheck_forecast(worker.city)
+
+    def recheck_forecast(self, finished_city):
+        # Miasto zmienione w trakcie pobierania - prognoza bieżącego miasta, jeśli nadal jej brakuje
+        # (to samo miasto nie jest ponawiane, żeby awaria serwisu nie zapętliła żądań)
+        city = self.user_data.get("city", "").strip()
+        if city and normalize_city(city) != normalize_city(finished_city):
+            self.prefetch_forecast(city)
+
+    def cancel_weather_requests(self):
+        # Nowy numer żądania: odpowiedzi trwających już wątków (których nie da się przerwać) są odtąd nieaktualne,
+        # także gdy update_weather kończy się bez nowego żądania (brak miasta, świeże dane z pamięci podręcznej)
+        self.weather_request_id += 1
+        for request_id, worker in list(self.weather_workers.items()):
+            worker.cancel()
+            # Żądanie jeszcze w kolejce można usunąć od razu, trwające zostanie zignorowane
+            if self.weather_pool.tryTake(worker):
+                del self.weather_workers[request_id]
+                logging.info(f"Anulowano żądanie pogody: {worker.city}")
+
+    def on_weather_finished(self, request_id, city, status_code, data):
+        self.weather_workers.pop(request_id, None)
+        if request_id != self.weather_request_id:
+            logging.info(f"Pominięto nieaktualną odpowiedź pogody (id: {request_id})")
+            return
+
+        try:
+            if status_code == 200:
+                self.show_weather(data)
             else:
                 error_msg = data.get("message", "Nieznany błąd")
                 self.weather_info_label.setText(f"Błąd: {error_msg}")
                 self.weather_temp_label.setText("")
         except Exception as e:
-            logging.error(f"Błąd pobierania pogody: {e}")
-            self.weather_info_label.setText("Błąd pobierania pogody")
-            self.weather_temp_label.setText("")
+            self.on_weather_failed(request_id, str(e))
 
-    def update_today_courses(self):
-        while self.today_courses_layout.count():
-            child = self.today_courses_layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
+    def on_weather_failed(self, request_id, error):
+        self.weather_workers.pop(request_id, None)
+        if request_id != self.weather_request_id:
+            return
+        logging.error(f"Błąd pobierania pogody: {error}, statystyki klienta: {self.weather_client.get_stats()}")
+        if self.weather_cache.get(self.user_data.get("city", ""))[0] is not None:
+            return  # Zostawiamy ostatnie znane dane z pamięci podręcznej
+        self.weather_info_label.setText("Błąd pobierania pogody")
+        self.weather_temp_label.setText("")
 
-        days_pl = ["pon", "wt", "śr", "czw", "pt", "sob", "niedz"]
-        today = QDate.currentDate().dayOfWeek() - 1
-        today_day = days_pl[today]
+    def update_today_courses(self):
+        # Zmiany kursów docierają do modelu sygnałami; tu tylko zmiana dnia (np. aplikacja otwarta po północy)
+        self.today_courses_model.set_day(QDate.currentDate().dayOfWeek() - 1)
+        self.update_today_courses_empty()
 
-        today_courses = []
-        for course in self.courses:
-            try:
-                if today_day in course.get("days", []):
-                    today_courses.append(course)
-            except KeyError as e:
-                logging.error(f"Pominięto kurs z brakującymi danymi: {e}")
-                continue
-
-        if not today_courses:
-            label = QLabel("Brak zajęć na dziś")
-            label.setStyleSheet("background: transparent;")  # Przezroczyste tło
-            self.today_courses_layout.addWidget(label)
-            logging.info("Brak dzisiejszych kursów, dodano etykietę")
-            return
+    def update_today_courses_empty(self, *args):
+        empty = self.today_courses_model.rowCount() == 0
+        self.today_courses_empty_label.setVisible(empty)
+        self.today_courses_view.setVisible(not empty)
 
-        for course in today_courses:
-            try:
-                course_widget = QWidget()
-                course_widget.setStyleSheet("background: transparent;")  # Przezroczyste tło
-                course_layout = QVBoxLayout()
-                course_widget.setLayout(course_layout)
-
-                name_label = QLabel(f"<b>{course['name']}</b>")
-                name_label.setStyleSheet("background: transparent;")
-                lecturer_label = QLabel(f"Prowadzący: {course.get('lecturer', 'Brak')}")
-                lecturer_label.setStyleSheet("background: transparent;")
-                absences_label = QLabel(f"Nieobecności: {course['current_absences']}/{course['max_absences']}")
-                absences_label.setStyleSheet("background: transparent;")
-                mandatory_label = QLabel(f"Obowiązkowy: {'Tak' if course['mandatory'] else 'Nie'}")
-                mandatory_label.setStyleSheet("background: transparent;")
-
-                course_layout.addWidget(name_label)
-                course_layout.addWidget(lecturer_label)
-                course_layout.addWidget(absences_label)
-                course_layout.addWidget(mandatory_label)
-
-                self.today_courses_layout.addWidget(course_widget)
-                logging.info(f"Dodano kurs do listy dzisiejszych: {course['name']}")
-            except KeyError as e:
-                logging.error(f"Błąd wyświetlania kursu {course.get('name', 'Unknown')}: {e}")
-                continue
-
-        self.today_courses_widget.update()
-        logging.info(f"Zaktualizowano listę dzisiejszych kursów, liczba: {len(today_courses)}")
-
-    def update_courses_list(self):
-        self.courses_list.clear()
-        self.course_combo.clear()
-        for course in self.courses:
-            try:
-                item = QListWidgetItem(course["name"])
-                item.setData(Qt.UserRole, course)
-                self.courses_list.addItem(item)
-                self.course_combo.addItem(course["name"])
-            except KeyError as e:
-                logging.error(f"Pominięto kurs z brakującymi danymi: {e}")
-                continue
-        logging.info(f"Zaktualizowano listę kursów: {len(self.courses)} kursów")
-        self.courses_list.update()
-        self.course_combo.update()
-        self.update_grades_form()
+    def selected_course(self):
+        # Kurs wybrany w course_combo (po id - nazwy mogą różnić się tylko wielkością liter)
+        course_id = self.course_combo.currentData(COURSE_ID_ROLE)
+        return None if course_id is None else self.course_repository.get(course_id)
 
     def update_grades_form(self):
-        self.grades_list.clear()
-        course_name = self.course_combo.currentText()
-        if not course_name:
+        course = self.selected_course()
+        if course is not None and not course.grades_loaded():
+            try:
+                course.grades
+            except ValueError as e:
+                self.recover_grades(e)
+                course = self.selected_course()
+        self.grade_model.set_course(course)
+        if self.grades_list.horizontalHeader().sortIndicatorSection() >= 0:
+            # Aktywne sortowanie musi objąć całą historię, nie tylko pierwszą stronę
+            self.grade_model.fetch_all()
+        if course is None:
             logging.info("Brak wybranego kursu w course_combo")
             return
-
-        course = None
-        for c in self.courses:
-            if c["name"] == course_name:
-                course = c
-                break
-
-        if not course:
-            logging.warning(f"Nie znaleziono kursu: {course_name}")
-            return
-
-        if "grades" not in course:
-            course["grades"] = []
-            self.save_data()
-
-        logging.info(f"Aktualizacja listy ocen dla kursu: {course['name']}, oceny: {course['grades']}")
-        for grade in course["grades"]:
-            try:
-                if not isinstance(grade, dict):
-                    logging.error(f"Pominięto nieprawidłowy wpis oceny: {grade}")
-                    continue
-                text = f"{grade['value']}"
-                if grade.get('note') and grade['note'].strip():
-                    text += f" - {grade['note']}"
-                if grade.get('date'):
-                    text += f" ({grade['date']})"
-
-                item = QListWidgetItem(text)
-                item.setData(Qt.UserRole, grade)
-                self.grades_list.addItem(item)
-            except (KeyError, TypeError) as e:
-                logging.error(f"Błąd przetwarzania oceny: {e}, wpis: {grade}")
-                continue
-
-        self.grades_list.update()
-        logging.info(f"Lista ocen zaktualizowana, elementów: {self.grades_list.count()}")
+        logging.info(f"Lista ocen kursu {course.name}: {course.stats.count} ocen")
+
+    def recover_grades(self, error):
+        # Uszkodzona lista ocen wykryta po starcie (oceny parsowane leniwie). Kursy są wczytywane ponownie
+        # bez odkładania ocen, więc uszkodzony plik główny zastępuje kopia zapasowa; profil i styl zostają z pamięci.
+        logging.error(f"Błąd wczytywania ocen: {error}")
+        user_data, style = self.user_data, self.current_style
+        self.data_writer.flush()
+        self.load_data(lazy=False)
+        self.user_data, self.current_style = user_data, style
+        QMessageBox.warning(self, "Błąd", "Uszkodzona lista ocen. Dane kursów wczytano z kopii zapasowej.")
+
+    def selected_grade_row(self):
+        # Pozycja zaznaczonej oceny na liście kursu (niezależna od sortowania widoku) albo None
+        rows = self.grades_list.selectionModel().selectedRows()
+        if not rows:
+            return None
+        return self.grade_proxy.mapToSource(rows[0]).row()
 
     def add_course(self):
         name = self.name_input.text().strip()
@@ -656,31 +925,19 @@ class CourseManagerApp(QMainWindow):
             QMessageBox.warning(self, "Błąd", "Wybierz przynajmniej jeden dzień zajęć!")
             return
 
-        existing_index = -1
-        for i, course in enumerate(self.courses):
-            if course["name"].lower() == name.lower():
-                existing_index = i
-                break
-
-        course_data = {
-            "name": name,
-            "days": selected_days,
-            "lecturer": lecturer,
-            "max_absences": max_absences,
-            "current_absences": current_absences,
-            "mandatory": mandatory,
-            "grades": []
-        }
+        existing = self.course_repository.find(name)
 
-        if existing_index >= 0:
-            course_data["grades"] = self.courses[existing_index].get("grades", [])
-            self.courses[existing_index] = course_data
+        course_data = Course(name, selected_days, lecturer, max_absences, current_absences, mandatory)
+
+        if existing is not None:
+            existing_index = self.course_repository.position(existing)
+            course_data.take_grades(existing)
+            self.course_model.replace_course(existing_index, course_data)
+            self.record_change("update_course", course=existing_index, fields=course_data.header_dict())
         else:
-            self.courses.append(course_data)
+            self.course_model.add_course(course_data)
+            self.record_change("add_course", course=course_data.to_dict())
 
-        self.save_data()
-        self.update_courses_list()
-        self.update_today_courses()
         logging.info(f"Dodano/Zaktualizowano kurs: {name}")
 
         self.name_input.clear()
@@ -691,37 +948,31 @@ class CourseManagerApp(QMainWindow):
         for checkbox in self.days_checkboxes.values():
             checkbox.setChecked(False)
 
-    def load_course_for_edit(self, item):
+    def load_course_for_edit(self, index):
         try:
-            course = item.data(Qt.UserRole)
-            self.name_input.setText(course["name"])
-            self.lecturer_input.setText(course.get("lecturer", ""))
-            self.absences_input.setValue(course["max_absences"])
-            self.current_absences_input.setValue(course["current_absences"])
-            self.mandatory_check.setChecked(course["mandatory"])
-            
+            course = self.course_repository.get(index.data(COURSE_ID_ROLE))
+            if course is None:
+                raise KeyError(index.data())
+            self.name_input.setText(course.name)
+            self.lecturer_input.setText(course.lecturer)
+            self.absences_input.setValue(course.max_absences)
+            self.current_absences_input.setValue(course.current_absences)
+            self.mandatory_check.setChecked(course.mandatory)
+
             for day, checkbox in self.days_checkboxes.items():
-                checkbox.setChecked(day in course.get("days", []))
+                checkbox.setChecked(day in course.days)
         except KeyError as e:
             logging.error(f"Błąd ładowania kursu do edycji: {e}")
             QMessageBox.warning(self, "Błąd", "Nie można załadować kursu do edycji")
 
     def add_grade(self):
-        course_name = self.course_combo.currentText()
-        if not course_name:
+        if self.course_combo.currentIndex() < 0:
             QMessageBox.warning(self, "Błąd", "Wybierz przedmiot!")
             return
 
-        course = None
-        course_index = -1
-        for i, c in enumerate(self.courses):
-            if c["name"] == course_name:
-                course = c
-                course_index = i
-                break
-
-        if not course:
-            logging.warning(f"Nie znaleziono kursu: {course_name}")
+        course = self.selected_course()
+        if course is None:
+            logging.warning(f"Nie znaleziono kursu: {self.course_combo.currentText()}")
             QMessageBox.warning(self, "Błąd", "Nie znaleziono wybranego kursu!")
             return
 
@@ -733,32 +984,26 @@ class CourseManagerApp(QMainWindow):
             QMessageBox.warning(self, "Błąd", "Wprowadź ocenę!")
             return
 
-        grade = {
-            "value": value,
-            "note": note,
-            "date": date
-        }
-
-        if "grades" not in course:
-            course["grades"] = []
+        grade = Grade(value, note, date)
+        if grade.kind is None:
+            # Dowolny tekst jest dozwolony, ale nie wchodzi do średniej
+            logging.info(f"Nierozpoznany zapis oceny: {value}")
+        course_index = self.course_repository.position(course)
 
         if self.editing_grade_index is not None:
             try:
-                course["grades"][self.editing_grade_index] = grade
-                logging.info(f"Zaktualizowano ocenę w kursie: {course['name']}, indeks: {self.editing_grade_index}, ocena: {grade}")
+                self.grade_model.set_grade(self.editing_grade_index, grade)
+                self.record_change("edit_grade", course=course_index, index=self.editing_grade_index, grade=grade.to_dict())
+                logging.info(f"Zaktualizowano ocenę w kursie: {course.name}, indeks: {self.editing_grade_index}, ocena: {grade}")
             except IndexError as e:
                 logging.error(f"Błąd aktualizacji oceny: {e}")
                 QMessageBox.warning(self, "Błąd", "Nie można zaktualizować oceny!")
                 return
         else:
-            course["grades"].append(grade)
-            logging.info(f"Dodano ocenę do kursu: {course['name']}, ocena: {grade}")
+            self.grade_model.add_grade(grade)
+            self.record_change("add_grade", course=course_index, grade=grade.to_dict())
+            logging.info(f"Dodano ocenę do kursu: {course.name}, ocena: {grade}")
 
-        self.courses[course_index] = course
-        self.save_data()
-        self.update_courses_list()
-        self.course_combo.setCurrentText(course_name)
-        self.update_grades_form()
         self.grade_value_input.clear()
         self.grade_note_input.clear()
         self.grade_date_input.setDate(QDate.currentDate())
@@ -766,48 +1011,39 @@ class CourseManagerApp(QMainWindow):
         self.grades_list.clearSelection()
 
     def on_grade_selection_changed(self):
-        selected_items = self.grades_list.selectedItems()
-        self.edit_grade_btn.setEnabled(bool(selected_items))
-        self.remove_grade_btn.setEnabled(bool(selected_items))
+        selected = self.grades_list.selectionModel().hasSelection()
+        self.edit_grade_btn.setEnabled(selected)
+        self.remove_grade_btn.setEnabled(selected)
 
     def edit_grade(self):
-        course_name = self.course_combo.currentText()
-        if not course_name:
+        if self.course_combo.currentIndex() < 0:
             QMessageBox.warning(self, "Błąd", "Wybierz przedmiot!")
             return
 
-        course = None
-        for c in self.courses:
-            if c["name"] == course_name:
-                course = c
-                break
-
-        if not course:
-            logging.warning(f"Nie znaleziono kursu: {course_name}")
+        course = self.selected_course()
+        if course is None:
+            logging.warning(f"Nie znaleziono kursu: {self.course_combo.currentText()}")
             QMessageBox.warning(self, "Błąd", "Nie znaleziono wybranego kursu!")
             return
 
-        selected_items = self.grades_list.selectedItems()
-        if not selected_items:
+        item_index = self.selected_grade_row()
+        if item_index is None:
             QMessageBox.warning(self, "Błąd", "Wybierz ocenę do edycji!")
             return
 
-        selected_item = selected_items[0]
-        item_index = self.grades_list.row(selected_item)
-
         try:
-            grade = course["grades"][item_index]
-            self.grade_value_input.setText(grade.get("value", ""))
-            self.grade_note_input.setText(grade.get("note", ""))
-            if grade.get("date"):
-                date = QDate.fromString(grade["date"], "yyyy-MM-dd")
+            grade = course.grades[item_index]
+            self.grade_value_input.setText(grade.value)
+            self.grade_note_input.setText(grade.note)
+            if grade.date:
+                date = QDate.fromString(grade.date, "yyyy-MM-dd")
                 self.grade_date_input.setDate(date)
             else:
                 self.grade_date_input.setDate(QDate.currentDate())
             
             self.editing_grade_index = item_index
             logging.info(f"Załaduj ocenę do edycji: {grade}, indeks: {item_index}")
-        except (IndexError, KeyError) as e:
+        except IndexError as e:
             logging.error(f"Błąd ładowania oceny do edycji: {e}")
             QMessageBox.warning(self, "Błąd", "Nie można załadować oceny do edycji!")
 
@@ -820,40 +1056,25 @@ class CourseManagerApp(QMainWindow):
         logging.info("Anulowano edycję oceny")
 
     def remove_grade(self):
-        course_name = self.course_combo.currentText()
-        if not course_name:
+        if self.course_combo.currentIndex() < 0:
             QMessageBox.warning(self, "Błąd", "Wybierz przedmiot!")
             return
 
-        course = None
-        course_index = -1
-        for i, c in enumerate(self.courses):
-            if c["name"] == course_name:
-                course = c
-                course_index = i
-                break
-
-        if not course:
-            logging.warning(f"Nie znaleziono kursu: {course_name}")
+        course = self.selected_course()
+        if course is None:
+            logging.warning(f"Nie znaleziono kursu: {self.course_combo.currentText()}")
             QMessageBox.warning(self, "Błąd", "Nie znaleziono wybranego kursu!")
             return
 
-        selected_items = self.grades_list.selectedItems()
-        if not selected_items:
+        item_index = self.selected_grade_row()
+        if item_index is None:
             QMessageBox.warning(self, "Błąd", "Wybierz ocenę do usunięcia!")
             return
 
-        selected_item = selected_items[0]
-        item_index = self.grades_list.row(selected_item)
-
         try:
-            removed_grade = course["grades"].pop(item_index)
-            logging.info(f"Usunięto ocenę z kursu: {course['name']}, indeks: {item_index}, ocena: {removed_grade}")
-            self.courses[course_index] = course
-            self.save_data()
-            self.update_courses_list()
-            self.course_combo.setCurrentText(course_name)
-            self.update_grades_form()
+            removed_grade = self.grade_model.remove_grade(item_index)
+            self.record_change("remove_grade", course=self.course_repository.position(course), index=item_index)
+            logging.info(f"Usunięto ocenę z kursu: {course.name}, indeks: {item_index}, ocena: {removed_grade}")
             self.grade_value_input.clear()
             self.grade_note_input.clear()
             self.grade_date_input.setDate(QDate.currentDate())
@@ -871,7 +1092,7 @@ class CourseManagerApp(QMainWindow):
 
         if file_path:
             self.user_data["profile_pic"] = file_path
-            self.save_data()
+            self.record_change("set_user", key="profile_pic", value=file_path)
             self.update_profile_pic()
             self.update_profile_pic_edit()
             logging.info(f"Zmieniono zdjęcie profilowe na: {file_path}")
@@ -881,105 +1102,14 @@ class CourseManagerApp(QMainWindow):
             QMessageBox.warning(self, "Błąd", "Najpierw dodaj jakieś przedmioty!")
             return
 
-        mood = self.mood_input.value()
-        analysis = "<h3>Analiza:</h3>"
-
-        # Analiza pogody
-        if self.weather_data:
-            try:
-                weather_id = self.weather_data["weather"][0]["id"]
-                if weather_id < 600:
-                    analysis += "<p>Uwaga: Dzisiaj pada. Rozważ zabranie parasola lub ubranie się odpowiednio do pogody.</p>"
-                elif weather_id == 800:
-                    analysis += "<p>Pogoda jest ładna, to dobry dzień na zajęcia!</p>"
-                elif weather_id > 800:
-                    analysis += "<p>Dzisiaj jest pochmurno, ale to nie powinno wpłynąć na Twoją obecność.</p>"
-            except KeyError as e:
-                logging.error(f"Błąd analizy pogody: {e}")
-                analysis += "<p>Błąd analizy pogody.</p>"
-
-        # Analiza samopoczucia
-        if mood < 3:
-            analysis += "<p style='color: red;'>Twoje samopoczucie jest bardzo słabe. Jeśli to możliwe, rozważ pozostanie w domu i odpoczynek.</p>"
-        elif mood < 5:
-            analysis += "<p style='color: orange;'>Twoje samopoczucie jest słabe. Jeśli przedmioty nie są obowiązkowe, możesz rozważyć nieobecność.</p>"
-        elif mood < 7:
-            analysis += "<p>Twoje samopoczucie jest w porządku. Powinieneś być w stanie pójść na zajęcia.</p>"
-        else:
-            analysis += "<p style='color: green;'>Twoje samopoczucie jest bardzo dobre! To świetny dzień na naukę.</p>"
-
-        # Analiza dzisiejszych zajęć
-        days_pl = ["pon", "wt", "śr", "czw", "pt", "sob", "niedz"]
-        today = QDate.currentDate().dayOfWeek() - 1
-        today_day = days_pl[today]
-
-        today_courses = []
-        for course in self.courses:
-            try:
-                if today_day in course.get("days", []):
-                    today_courses.append(course)
-            except KeyError as e:
-                logging.error(f"Pominięto kurs w analizie: {e}")
-                continue
-
-        if not today_courses:
-            analysis += "<p>Dzisiaj nie masz żadnych zajęć. Możesz odpocząć!</p>"
-        else:
-            analysis += "<h4>Dzisiejsze zajęcia:</h4>"
-
-            for course in today_courses:
-                try:
-                    course_analysis = f"<p><b>{course['name']}</b><br>"
-
-                    if course['mandatory']:
-                        course_analysis += "- <span style='color: red;'>Obowiązkowe: Musisz iść na zajęcia</span><br>"
-                    else:
-                        course_analysis += "- Nieobowiązkowe: Możesz rozważyć nieobecność<br>"
-
-                    absence_percentage = (course['current_absences'] / course['max_absences']) * 100 if course['max_absences'] > 0 else 0
-                    if absence_percentage > 80:
-                        course_analysis += "- <span style='color: red;'>Uwaga! Masz już prawie wyczerpany limit nieobecności</span><br>"
-                    elif absence_percentage > 50:
-                        course_analysis += "- Masz wykorzystaną ponad połowę nieobecności<br>"
-                    else:
-                        course_analysis += "- Masz jeszcze sporo nieobecności do wykorzystania<br>"
-
-                    if course.get('grades'):
-                        numeric_grades = []
-                        for grade in course['grades']:
-                            try:
-                                numeric_grade = float(grade['value'])
-                                numeric_grades.append(numeric_grade)
-                            except (ValueError, KeyError):
-                                continue
-
-                        if numeric_grades:
-                            avg_grade = sum(numeric_grades) / len(numeric_grades)
-                            if avg_grade >= 4.0:
-                                course_analysis += "- Twoje oceny są dobre, możesz sobie pozwolić na nieobecność<br>"
-                            elif avg_grade >= 3.0:
-                                course_analysis += "- Twoje oceny są średnie, lepiej idź na zajęcia<br>"
-                            else:
-                                course_analysis += "- <span style='color: red;'>Twoje oceny są słabe, koniecznie idź na zajęcia</span><br>"
-                        else:
-                            course_analysis += "- Brak ocen liczbowych do analizy<br>"
-                    else:
-                        course_analysis += "- Brak ocen do analizy<br>"
-
-                    analysis += course_analysis + "</p>"
-                except KeyError as e:
-                    logging.error(f"Błąd analizy kursu {course.get('name', 'Unknown')}: {e}")
-                    continue
-
-            mandatory_courses = [c for c in today_courses if c.get('mandatory', False)]
-            if mandatory_courses:
-                analysis += "<h3 style='color: red;'>Rekomendacja: Musisz iść na zajęcia (przedmioty obowiązkowe)</h3>"
-            elif mood < 3:
-                analysis += "<h3 style='color: orange;'>Rekomendacja: Zostań w domu i odpocznij</h3>"
-            elif mood < 5:
-                analysis += "<h3 style='color: orange;'>Rekomendacja: Możesz zostać w domu, ale rozważ pójście na zajęcia</h3>"
-            else:
-                analysis += "<h3 style='color: green;'>Rekomendacja: Idź na zajęcia</h3>"
+        analysis_date = self.analysis_date_input.date()
+        day_courses = self.course_repository.courses_for_day(analysis_date.dayOfWeek() - 1)
+        recommendation = recommend(
+            self.mood_input.value(),
+            [CourseInput.from_course(course) for course in day_courses],
+            self.weather_for_date(analysis_date)
+        )
+        analysis = self.render_analysis(recommendation, analysis_date)
 
         dialog = QMessageBox(self)
         dialog.setWindowTitle("Analiza obecności")
@@ -988,10 +1118,48 @@ class CourseManagerApp(QMainWindow):
         dialog.setStandardButtons(QMessageBox.Ok)
         dialog.exec_()
 
+    def render_analysis(self, recommendation, analysis_date):
+        # Zamiana wyniku silnika decyzyjnego na HTML okna analizy
+        analysis = "<h3>Analiza:</h3>"
+        today = analysis_date == QDate.currentDate()
+        date = analysis_date.toString('yyyy-MM-dd')
+        if not today:
+            analysis += f"<p><i>Dzień: {date} (pogoda według prognozy)</i></p>"
+
+        if recommendation.weather == "error":
+            logging.error("Błąd analizy pogody: niepełne dane pogodowe")
+        if recommendation.weather is not None:
+            weather_text = WEATHER_TEXTS if today else FORECAST_TEXTS
+            analysis += f"<p>{weather_text[recommendation.weather].format(date=date)}</p>"
+
+        mood_color, mood_text = MOOD_TEXTS[recommendation.mood]
+        analysis += f"<p style='color: {mood_color};'>{mood_text}</p>" if mood_color else f"<p>{mood_text}</p>"
+
+        if not recommendation.courses:
+            day = "Dzisiaj" if today else f"W dniu {date}"
+            analysis += f"<p>{day} nie masz żadnych zajęć. Możesz odpocząć!</p>"
+        else:
+            heading = "Dzisiejsze zajęcia" if today else f"Zajęcia w dniu {date}"
+            analysis += f"<h4>{heading}:</h4>"
+            for course in recommendation.courses:
+                course_analysis = f"<p><b>{course.name}</b> ({VERDICT_TEXTS[course.verdict]})<br>"
+                for reason in course.reasons:
+                    text = REASON_TEXTS[reason]
+                    if SEVERITY[reason] == "alert":
+                        text = f"<span style='color: red;'>{text}</span>"
+                    course_analysis += f"- {text}<br>"
+                analysis += course_analysis + "</p>"
+
+        if recommendation.overall != "free_day":
+            color, text = OVERALL_TEXTS[recommendation.overall]
+            analysis += f"<h3 style='color: {color};'>Rekomendacja: {text}</h3>"
+        return analysis
+
     def apply_style(self, style_name):
+        if style_name != self.current_style or self.user_data.get("style") != style_name:
+            self.record_change("set_style", value=style_name)
         self.current_style = style_name
         self.user_data["style"] = style_name
-        self.save_data()
 
         styles = {
             "Sakura Pink": {
@@ -1044,7 +1212,7 @@ class CourseManagerApp(QMainWindow):
                 color: {style_config['text_color']};
                 border: 1px solid {style_config['text_color']};
             }}
-            QListWidget {{
+            QListView, QTableView {{
                 background-color: {style_config['list_color']};
                 color: {style_config['text_color']};
             }}
@@ -1094,59 +1262,114 @@ class CourseManagerApp(QMainWindow):
         self.update_anime_character()
         logging.info(f"Zastosowano styl: {style_name}")
 
+    def record_change(self, op, **fields):
+        # Dopisanie pojedynczej zmiany do dziennika zamiast przepisywania całego pliku;
+        # dziennik jest składany w migawkę w tle po przekroczeniu progu rozmiaru
+        self.journal_seq += 1
+        entry = {"seq": self.journal_seq, "op": op}
+        entry.update(fields)
+        self.data_writer.append(entry)
+        self.cache_stale = True  # Dziennik się zmienił - znacznik migawki binarnej przestaje pasować
+
     def save_data(self):
-        data = {
-            "courses": self.courses,
+        # Pełna migawka danych, właściwy zapis wykonuje write_data
+        self.save_debouncer.trigger()
+
+    def data_snapshot(self):
+        return {
+            "courses": [course.to_dict() for course in self.courses],
             "user_data": self.user_data,
-            "style": self.current_style
+            "style": self.current_style,
+            "journal_seq": self.journal_seq,
+            "schema_version": SCHEMA_VERSION
         }
+
+    def write_data(self, snapshot=None):
+        if self.data_writer.last_error is not None:
+            self.data_writer.last_error = None
+            QMessageBox.warning(self, "Błąd", "Nie udało się zapisać danych!")
+        self.cache_stale = True
         try:
-            with open("course_data.json", "w", encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
-            logging.info(f"Zapisano dane do course_data.json, imię: {self.user_data['name']}")
+            # Serializacja na wątku GUI (spójny stan), zapis na dysk w tle
+            self.data_writer.submit(serialize_data(snapshot if snapshot is not None else self.data_snapshot()))
+            logging.info(f"Zlecono zapis danych do {self.data_path}, imię: {self.user_data['name']}")
         except Exception as e:
             logging.error(f"Błąd zapisu danych: {e}")
             QMessageBox.warning(self, "Błąd", "Nie udało się zapisać danych!")
 
-    def load_data(self):
-        if os.path.exists("course_data.json"):
+    def flush_data(self):
+        # Synchroniczny zapis oczekujących zmian (zamykanie aplikacji). Pełna migawka powstaje tylko wtedy,
+        # gdy czeka zapis z debouncera; zmiany z dziennika są już zlecone, wystarczy opróżnić kolejkę.
+        # Zwraca zapisaną migawkę (do ponownego użycia) albo None.
+        snapshot = None
+        if self.save_debouncer.is_pending():
+            self.save_debouncer.cancel()
             try:
-                with open("course_data.json", "r", encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.courses = data.get("courses", [])
-                    self.user_data = data.get("user_data", {
-                        "name": "", "profile_pic": "", "city": ""
-                    })
-                    self.current_style = data.get("style", "Windows XP")
-
-                    for course in self.courses:
-                        course.setdefault("name", "Unnamed Course")
-                        if isinstance(course.get("days"), str):
-                            course["days"] = [d.strip() for d in course["days"].split(",") if d.strip()]
-                        course.setdefault("days", [])
-                        course.setdefault("lecturer", "")
-                        course.setdefault("max_absences", 0)
-                        course.setdefault("current_absences", 0)
-                        course.setdefault("mandatory", False)
-                        course.setdefault("grades", [])
-                        
-                        validated_grades = []
-                        for grade in course["grades"]:
-                            if isinstance(grade, dict):
-                                grade.setdefault("value", "")
-                                grade.setdefault("note", "")
-                                grade.setdefault("date", "")
-                                validated_grades.append(grade)
-                            else:
-                                logging.error(f"Pominięto nieprawidłowy wpis oceny: {grade}")
-                                continue
-                        course["grades"] = validated_grades
+                snapshot = self.data_snapshot()
+            except ValueError as e:
+                # Uszkodzone oceny kursu wczytanego leniwie - zapis pominięty, plik na dysku zostaje bez zmian
+                logging.error(f"Błąd zapisu danych: {e}")
+            else:
+                self.write_data(snapshot)
+        self.data_writer.flush()
+        if self.data_writer.last_error is not None:
+            QMessageBox.warning(self, "Błąd", "Nie udało się zapisać danych!")
+        return snapshot
+
+    def load_data(self, lazy=True):
+        # Aktualna migawka binarna zawiera już zwalidowane dane - bez parsowania JSON i walidacji
+        if self.storage_backend == "json" and lazy:
+            cached = read_binary_cache(self.data_path)
+            if cached is not None:
+                self.course_model.load([Course.from_dict(c) for c in cached["courses"]])
+                self.user_data = cached["user_data"]
+                self.current_style = cached["style"]
+                self.journal_seq = cached["journal_seq"]
+                self.cache_stale = False
+                logging.info(f"Załadowano dane z migawki binarnej, imię: {self.user_data['name']}")
+                return
 
+        if os.path.exists(self.data_path) or os.path.exists(journal_path_for(self.data_path)):
+            try:
+                if self.storage_backend == "sqlite":
+                    data, self.journal_seq, replayed = load_sqlite(self.data_path)
+                elif self.storage_backend == "sharded":
+                    data, self.journal_seq, replayed = load_sharded(self.data_path)
+                else:
+                    # Oceny kursów parsowane leniwie, przy pierwszym użyciu
+                    try:
+                        data, self.journal_seq, replayed = load_with_journal(self.data_path, lazy=lazy)
+                    except JournalGapError as e:
+                        # Kopia zapasowa bez zmian z dziennika - dziennik zostaje zachowany obok do ręcznego odzyskania
+                        logging.error(f"Błąd odtwarzania dziennika: {e}")
+                        self.data_writer.set_aside_journal()
+                        data, replayed = e.data, 0
+                        self.journal_seq = data.get("journal_seq", 0)
+                        QMessageBox.warning(self, "Błąd", "Plik danych był uszkodzony. Wczytano kopię zapasową, "
+                                            "ale ostatnich zmian nie udało się odtworzyć.")
+                if replayed:
+                    logging.info(f"Odtworzono {replayed} zmian z dziennika")
+                # Starsze pliki są jednorazowo migrowane i zapisywane z aktualnym schema_version,
+                # pliki w bieżącej wersji nie przechodzą żadnej normalizacji
+                migrated = migrate_data(data)
+                if self.course_model.load([Course.from_dict(c) for c in data.get("courses", [])]):
+                    migrated = True  # Kursy bez id dostały nowe identyfikatory
+                self.user_data = data.get("user_data", {
+                    "name": "", "profile_pic": "", "city": ""
+                })
+                self.current_style = data.get("style", "Windows XP")
+                if migrated:
                     self.save_data()
-                    logging.info(f"Załadowano dane, imię: {self.user_data['name']}")
+                logging.info(f"Załadowano dane, imię: {self.user_data['name']}")
             except Exception as e:
+                if lazy and self.storage_backend == "json" and isinstance(e, ValueError):
+                    # Uszkodzona lista ocen - pełny odczyt pliku głównego zawiedzie i przejdzie na kopię zapasową
+                    logging.error(f"Błąd leniwego ładowania danych: {e}")
+                    return self.load_data(lazy=False)
                 logging.error(f"Błąd ładowania danych: {e}")
-                self.courses = []
+                # Zapis zlecony przed błędem (migracja) nadpisałby prawdziwe dane wartościami domyślnymi
+                self.save_debouncer.cancel()
+                self.course_model.load([])
                 self.user_data = {"name": "", "profile_pic": "", "city": ""}
                 self.current_style = "Windows XP"
                 QMessageBox.warning(self, "Błąd", "Błąd ładowania danych. Ustawiono domyślne wartości.")
@@ -1170,7 +1393,19 @@ class CourseManagerApp(QMainWindow):
         self.update_anime_character()
 
     def closeEvent(self, event):
-        self.save_data()
+        self.city_debouncer.flush()
+        self.cancel_weather_requests()
+        self.weather_client.close()
+        self.image_loader.close()
+        snapshot = self.flush_data()
+        # Szybki start przy następnym uruchomieniu - tylko gdy migawka binarna nie odpowiada już danym
+        if self.storage_backend == "json" and self.cache_stale:
+            try:
+                self.data_writer.save_cache(snapshot if snapshot is not None else self.data_snapshot())
+            except ValueError as e:
+                # Kurs z uszkodzonymi, nigdy nieotwieranymi ocenami - bez migawki binarnej start wczyta plik JSON
+                logging.error(f"Pominięto zapis migawki binarnej: {e}")
+        self.data_writer.close()
         event.accept()
 
 if __name__ == "__main__":
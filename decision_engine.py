@@ -0,0 +1,179 @@
+# Logika rekomendacji obecności bez zależności od PyQt5: dane wejściowe i wynik to zwykłe obiekty,
+# więc analizę można uruchamiać bez GUI (testy, pomiary, przetwarzanie wielu dni naraz).
+# Wynik zawiera kody werdyktów i powodów; teksty i kolory dobiera warstwa wyświetlania.
+
+# Progi pogody według identyfikatorów OpenWeatherMap
+WEATHER_RAIN_BELOW = 600
+WEATHER_CLEAR = 800
+
+# Progi samopoczucia (skala 1-10)
+MOOD_VERY_POOR_BELOW = 3
+MOOD_POOR_BELOW = 5
+MOOD_OK_BELOW = 7
+
+# Progi wykorzystania limitu nieobecności w procentach
+ABSENCES_CRITICAL_ABOVE = 80
+ABSENCES_HALF_ABOVE = 50
+
+# Progi średniej ocen
+GRADES_GOOD_FROM = 4.0
+GRADES_AVERAGE_FROM = 3.0
+
+# Trend ocen (zmiana na kolejną ocenę) i minimalna liczba ocen, od której jest brany pod uwagę
+TREND_THRESHOLD = 0.25
+TREND_MIN_GRADES = 3
+
+# Waga powodów: "alert" - wymaga uwagi, "info" - neutralny, "good" - sprzyja nieobecności lub odpoczynkowi
+SEVERITY = {
+    "mandatory": "alert",
+    "optional": "info",
+    "absences_critical": "alert",
+    "absences_half": "info",
+    "absences_ok": "info",
+    "grades_good": "info",
+    "grades_average": "info",
+    "grades_poor": "alert",
+    "trend_down": "info",
+    "trend_up": "info",
+    "no_numeric_grades": "info",
+    "no_grades": "info"
+}
+
+
+class CourseInput:
+    # Dane kursu potrzebne do analizy; from_course pobiera je z obiektu Course bez sięgania do listy ocen
+    __slots__ = ("course_id", "name", "mandatory", "current_absences", "max_absences",
+                 "grade_count", "numeric_count", "grade_mean", "trend", "recent_count")
+
+    def __init__(self, name, mandatory=False, current_absences=0, max_absences=0, grade_count=0,
+                 numeric_count=0, grade_mean=None, trend=None, recent_count=0, course_id=None):
+        self.course_id = course_id
+        self.name = name
+        self.mandatory = mandatory
+        self.current_absences = current_absences
+        self.max_absences = max_absences
+        self.grade_count = grade_count
+        self.numeric_count = numeric_count
+        self.grade_mean = grade_mean
+        self.trend = trend
+        self.recent_count = recent_count
+
+    @classmethod
+    def from_course(cls, course):
+        stats = course.stats
+        return cls(course.name, course.mandatory, course.current_absences, course.max_absences,
+                   stats.count, stats.numeric_count, stats.weighted_mean, stats.trend, len(stats.recent),
+                   course.id)
+
+
+class CourseVerdict:
+    # verdict: "must_attend", "should_attend" albo "may_skip"; reasons: kody powodów w kolejności wyświetlania
+    __slots__ = ("course_id", "name", "verdict", "reasons", "absence_percentage")
+
+    def __init__(self, course_id, name, verdict, reasons, absence_percentage):
+        self.course_id = course_id
+        self.name = name
+        self.verdict = verdict
+        self.reasons = reasons
+        self.absence_percentage = absence_percentage
+
+    def __repr__(self):
+        return f"CourseVerdict({self.name!r}, {self.verdict!r}, {self.reasons!r})"
+
+
+class Recommendation:
+    # weather: "rain", "clear", "clouds", "error" albo None (brak danych lub pogoda bez uwag)
+    # mood: "very_poor", "poor", "ok", "great"
+    # overall: "free_day", "must_attend", "stay_home", "may_stay_home", "attend"
+    __slots__ = ("weather", "mood", "courses", "overall")
+
+    def __init__(self, weather, mood, courses, overall):
+        self.weather = weather
+        self.mood = mood
+        self.courses = courses
+        self.overall = overall
+
+    def __repr__(self):
+        return f"Recommendation({self.overall!r}, weather={self.weather!r}, mood={self.mood!r}, courses={len(self.courses)})"
+
+
+def weather_condition(weather_data):
+    if not weather_data:
+        return None
+    try:
+        weather_id = weather_data["weather"][0]["id"]
+    except (KeyError, IndexError, TypeError):
+        return "error"
+    if weather_id < WEATHER_RAIN_BELOW:
+        return "rain"
+    if weather_id == WEATHER_CLEAR:
+        return "clear"
+    if weather_id > WEATHER_CLEAR:
+        return "clouds"
+    return None
+
+
+def mood_band(mood):
+    if mood < MOOD_VERY_POOR_BELOW:
+        return "very_poor"
+    if mood < MOOD_POOR_BELOW:
+        return "poor"
+    if mood < MOOD_OK_BELOW:
+        return "ok"
+    return "great"
+
+
+def evaluate_course(course):
+    reasons = ["mandatory" if course.mandatory else "optional"]
+
+    absence_percentage = (course.current_absences / course.max_absences) * 100 if course.max_absences > 0 else 0
+    if absence_percentage > ABSENCES_CRITICAL_ABOVE:
+        reasons.append("absences_critical")
+    elif absence_percentage > ABSENCES_HALF_ABOVE:
+        reasons.append("absences_half")
+    else:
+        reasons.append("absences_ok")
+
+    grades = None
+    if not course.grade_count:
+        reasons.append("no_grades")
+    elif not course.numeric_count or course.grade_mean is None:
+        reasons.append("no_numeric_grades")
+    else:
+        if course.grade_mean >= GRADES_GOOD_FROM:
+            grades = "grades_good"
+        elif course.grade_mean >= GRADES_AVERAGE_FROM:
+            grades = "grades_average"
+        else:
+            grades = "grades_poor"
+        reasons.append(grades)
+        if course.trend is not None and course.recent_count >= TREND_MIN_GRADES:
+            if course.trend <= -TREND_THRESHOLD:
+                reasons.append("trend_down")
+            elif course.trend >= TREND_THRESHOLD:
+                reasons.append("trend_up")
+
+    if course.mandatory:
+        verdict = "must_attend"
+    elif absence_percentage > ABSENCES_CRITICAL_ABOVE or grades in ("grades_average", "grades_poor"):
+        verdict = "should_attend"
+    else:
+        verdict = "may_skip"
+    return CourseVerdict(course.course_id, course.name, verdict, reasons, absence_percentage)
+
+
+def recommend(mood, courses, weather_data=None):
+    # mood: samopoczucie 1-10, courses: CourseInput zajęć danego dnia, weather_data: odpowiedź API pogody
+    band = mood_band(mood)
+    verdicts = [evaluate_course(course) for course in courses]
+    if not verdicts:
+        overall = "free_day"
+    elif any(verdict.verdict == "must_attend" for verdict in verdicts):
+        overall = "must_attend"
+    elif band == "very_poor":
+        overall = "stay_home"
+    elif band == "poor":
+        overall = "may_stay_home"
+    else:
+        overall = "attend"
+    return Recommendation(weather_condition(weather_data), band, verdicts, overall)
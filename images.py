@@ -0,0 +1,190 @@
+import os
+import logging
+from collections import OrderedDict
+
+from PyQt5.QtCore import Qt, QObject, QRect, QRunnable, QSize, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImageIOHandler, QImageReader, QPixmap
+
+
+def file_stamp(path):
+    # (czas modyfikacji, rozmiar) pliku albo None, gdy pliku nie ma
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class PixmapCache:
+    # Przeskalowane obrazy w pamięci LRU. Kluczem jest (ścieżka, czas modyfikacji, rozmiar pliku,
+    # rozmiar docelowy, device pixel ratio, przycięcie), więc zmiana pliku na dysku, rozmiaru albo ekranu
+    # daje nowy wpis, a pozostałe wywołania nic nie liczą.
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # klucz -> QPixmap, od najdawniej używanego
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, path, width, height, device_pixel_ratio=1.0, crop=False):
+        # Klucz wpisu albo None, gdy pliku nie ma
+        stamp = file_stamp(path)
+        if stamp is None:
+            return None
+        return path, stamp, width, height, device_pixel_ratio, crop
+
+    def get(self, key):
+        pixmap = self.entries.get(key)
+        if pixmap is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return pixmap
+
+    def put(self, key, pixmap):
+        self.entries[key] = pixmap
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+def read_scaled_image(path, width, height, crop=False):
+    # Dekodowanie tylko w potrzebnej rozdzielczości (width x height pikseli fizycznych): QImageReader
+    # czyta rozmiar z nagłówka, a dekoder zmniejsza obraz w trakcie czytania (np. JPEG - skala 1/2, 1/4, 1/8).
+    # crop=True: środkowy kwadrat oryginału (zdjęcie profilowe), crop=False: cały obraz z zachowaniem proporcji.
+    # Zwraca (QImage, None) albo (None, opis błędu). Bezpieczne w wątku roboczym (bez QPixmap).
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)  # Orientacja EXIF zdjęć z telefonu
+    size = reader.size()
+    if size.isValid():
+        if crop:
+            side = min(size.width(), size.height())
+            reader.setClipRect(QRect((size.width() - side) // 2, (size.height() - side) // 2, side, side))
+            reader.setScaledSize(QSize(width, height))
+        elif reader.transformation() & QImageIOHandler.TransformationRotate90:
+            # Obrót o 90 stopni jest stosowany po skalowaniu - docelowe wymiary liczone dla obróconego obrazu
+            target = size.transposed().scaled(width, height, Qt.KeepAspectRatio)
+            reader.setScaledSize(target.transposed())
+        else:
+            reader.setScaledSize(size.scaled(width, height, Qt.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        return None, reader.errorString()
+    return image, None
+
+
+class ImageSignals(QObject):
+    # Wynik dekodowania przekazywany z wątku roboczego do wątku GUI
+    loaded = pyqtSignal(int, object)  # id żądania, QImage
+    failed = pyqtSignal(int, str)  # id żądania, opis błędu
+
+
+class ImageWorker(QRunnable):
+    def __init__(self, request_id, path, width, height, crop):
+        super().__init__()
+        self.setAutoDelete(False)  # Referencję trzyma ImageLoader do czasu odebrania wyniku
+        self.request_id = request_id
+        self.path = path
+        self.width = width
+        self.height = height
+        self.crop = crop
+        self.cancelled = False
+        self.signals = ImageSignals()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        if self.cancelled:
+            self.signals.failed.emit(self.request_id, "Anulowano")
+            return
+        try:
+            image, error = read_scaled_image(self.path, self.width, self.height, self.crop)
+        except Exception as e:
+            image, error = None, str(e)
+        if image is None:
+            self.signals.failed.emit(self.request_id, error or "Nieznany błąd")
+        else:
+            self.signals.loaded.emit(self.request_id, image)
+
+
+class ImageLoader(QObject):
+    # Wczytywanie obrazów w tle dla nazwanych odbiorców (np. "anime", "profile_pic"). request zwraca obraz
+    # z pamięci podręcznej od razu, a w przeciwnym razie zleca dekodowanie i wynik przychodzi sygnałem ready.
+    # Liczy się tylko ostatnie żądanie odbiorcy; QImage jest zamieniany na QPixmap w wątku GUI.
+    ready = pyqtSignal(str, object)  # odbiorca, QPixmap
+    failed = pyqtSignal(str, str)  # odbiorca, opis błędu
+
+    def __init__(self, cache=None, parent=None, max_threads=2):
+        super().__init__(parent)
+        self.cache = cache if cache is not None else PixmapCache()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self.next_id = 0
+        self.current = {}  # odbiorca -> id ostatniego żądania
+        self.pending = {}  # id -> (odbiorca, klucz pamięci podręcznej, device pixel ratio, ImageWorker)
+
+    def request(self, target, path, width, height, device_pixel_ratio=1.0, crop=False):
+        key = self.cache.key(path, width, height, device_pixel_ratio, crop)
+        if key is None:
+            self.forget(target)
+            self.failed.emit(target, f"Brak pliku: {path}")
+            return None
+        pixmap = self.cache.get(key)
+        if pixmap is not None:
+            self.forget(target)
+            return pixmap
+        request_id = self.current.get(target)
+        if request_id in self.pending and self.pending[request_id][1] == key:
+            return None  # Ten sam obraz jest już dekodowany
+        self.forget(target)
+        self.next_id += 1
+        request_id = self.next_id
+        worker = ImageWorker(request_id, path, round(width * device_pixel_ratio),
+                             round(height * device_pixel_ratio), crop)
+        worker.signals.loaded.connect(self.on_loaded)
+        worker.signals.failed.connect(self.on_failed)
+        self.current[target] = request_id
+        self.pending[request_id] = (target, key, device_pixel_ratio, worker)
+        self.pool.start(worker)
+        return None
+
+    def forget(self, target):
+        # Porzucenie oczekującego żądania odbiorcy (np. zmiana motywu w trakcie wczytywania)
+        request_id = self.current.pop(target, None)
+        entry = self.pending.get(request_id)
+        if entry is not None:
+            entry[3].cancel()
+            if self.pool.tryTake(entry[3]):
+                del self.pending[request_id]
+
+    def on_loaded(self, request_id, image):
+        entry = self.pending.pop(request_id, None)
+        if entry is None:
+            return
+        target, key, device_pixel_ratio, _ = entry
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(device_pixel_ratio)
+        self.cache.put(key, pixmap)  # Także wynik porzuconego żądania - może się jeszcze przydać
+        if self.current.get(target) == request_id:
+            del self.current[target]
+            logging.info(f"Wczytano obraz {key[0]} ({image.width()}x{image.height()}) dla: {target}")
+            self.ready.emit(target, pixmap)
+
+    def on_failed(self, request_id, message):
+        entry = self.pending.pop(request_id, None)
+        if entry is None:
+            return
+        target = entry[0]
+        if self.current.get(target) == request_id:
+            del self.current[target]
+            logging.error(f"Błąd wczytywania obrazu {entry[1][0]}: {message}")
+            self.failed.emit(target, message)
+
+    def close(self):
+        for target in list(self.current):
+            self.forget(target)
+        self.pool.waitForDone()
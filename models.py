@@ -0,0 +1,451 @@
+import os
+import re
+from bisect import insort
+from functools import lru_cache
+
+
+# Kody dni tygodnia w kolejności QDate.dayOfWeek() - 1
+DAY_CODES = ["pon", "wt", "śr", "czw", "pt", "sob", "niedz"]
+DAY_BITS = {code: 1 << i for i, code in enumerate(DAY_CODES)}
+
+
+def days_to_mask(days):
+    # Lista kodów dni -> 7-bitowa maska (bit 0 = poniedziałek); nieznane kody są pomijane
+    mask = 0
+    for day in days or []:
+        mask |= DAY_BITS.get(day, 0)
+    return mask
+
+
+def mask_to_days(mask):
+    return [code for code, bit in DAY_BITS.items() if mask & bit]
+
+
+def name_key(name):
+    # Klucz porównywania nazw kursów: bez rozróżniania wielkości liter i nadmiarowych spacji
+    return " ".join(str(name).split()).casefold()
+
+
+def to_int(value, default=0):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_numeric(value):
+    # Wartość liczbowa albo None, gdy wartość nie jest liczbą
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def env_delta(name, default):
+    # Nieujemna wartość ze zmiennej środowiskowej; 0 jest poprawne (plusy i minusy bez wpływu na średnią)
+    value = parse_numeric(os.getenv(name))
+    return default if value is None or value < 0 else value
+
+
+# Zapis ocen: "4+" = 4 + GRADE_PLUS, "3-" = 3 - GRADE_MINUS (różnie w różnych szkołach, stąd zmienne środowiskowe)
+GRADE_PLUS = env_delta("GRADE_PLUS_DELTA", 0.5)
+GRADE_MINUS = env_delta("GRADE_MINUS_DELTA", 0.25)
+
+# Ocena liczbowa: cyfry z opcjonalną częścią dziesiętną (po zamianie przecinka na kropkę), w skali GRADE_MIN..GRADE_MAX
+GRADE_NUMBER = re.compile(r"[0-9]+(?:\.[0-9]+)?")
+GRADE_MIN = 1
+GRADE_MAX = 6
+
+# Oceny opisowe bez wartości liczbowej: rodzaj oceny
+GRADE_TOKENS = {
+    "zal": "pass", "zal.": "pass", "zaliczone": "pass", "zaliczony": "pass", "+": "pass",
+    "nzal": "fail", "nzal.": "fail", "niezal": "fail", "niezaliczone": "fail", "niezaliczony": "fail",
+    "nb": "absent", "nieob": "absent", "nieobecny": "absent",
+    "np": "unprepared", "-": "unprepared"
+}
+
+
+@lru_cache(maxsize=512)
+def parse_grade(value, plus=None, minus=None):
+    # Zapis oceny -> (wartość liczbowa albo None, rodzaj: "numeric", "pass", "fail", "absent", "unprepared", None).
+    # Obsługuje przecinek dziesiętny ("4,5"), plusy i minusy ("4+", "3-", "5-"), wyróżnienie "!" ("5!")
+    # i oceny opisowe ("zal", "nb"). Wynik dla danego zapisu jest liczony raz (oceny powtarzają się).
+    plus = GRADE_PLUS if plus is None else plus
+    minus = GRADE_MINUS if minus is None else minus
+    text = value.strip().casefold()
+    kind = GRADE_TOKENS.get(text)
+    if kind is not None:
+        return None, kind
+    text = text.rstrip("!").replace(",", ".").strip()
+    delta = 0
+    if len(text) > 1 and text[-1] in "+-":
+        delta = plus if text[-1] == "+" else -minus
+        text = text[:-1].rstrip()
+    if not GRADE_NUMBER.fullmatch(text):
+        return None, None
+    numeric = float(text)
+    if not GRADE_MIN <= numeric <= GRADE_MAX:
+        return None, None
+    return numeric + delta, "numeric"
+
+
+def notation_key():
+    # Ustawienia zapisu ocen, od których zależą zapisane agregaty
+    return [GRADE_PLUS, GRADE_MINUS, GRADE_MIN, GRADE_MAX]
+
+
+# Liczba ostatnich ocen liczbowych, z których liczony jest trend
+TREND_WINDOW = 5
+
+
+class Grade:
+    # Ocena z wartością liczbową i rodzajem wyliczonymi raz (parse_grade), przy wpisaniu lub wczytaniu
+    __slots__ = ("value", "note", "date", "weight", "numeric", "kind")
+
+    def __init__(self, value="", note="", date="", weight=1):
+        self.value = str(value)
+        self.note = str(note or "")
+        self.date = str(date or "")
+        self.weight = parse_numeric(weight) or 1
+        self.numeric, self.kind = parse_grade(self.value)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("value", ""), data.get("note", ""), data.get("date", ""), data.get("weight", 1))
+
+    def to_dict(self):
+        data = {"value": self.value, "note": self.note, "date": self.date}
+        if self.weight != 1:
+            data["weight"] = self.weight
+        return data
+
+    def __repr__(self):
+        return f"Grade({self.value!r}, {self.note!r}, {self.date!r})"
+
+
+class GradeStats:
+    # Bieżące agregaty ocen kursu aktualizowane przy każdej zmianie zamiast liczenia od nowa.
+    # values: wartość liczbowa -> liczba wystąpień (min/max po usunięciu oceny bez przeglądania listy),
+    # recent: ostatnie TREND_WINDOW ocen liczbowych w kolejności dodania.
+    __slots__ = ("count", "numeric_count", "total", "weighted_total", "weight_total", "values", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.numeric_count = 0
+        self.total = 0.0
+        self.weighted_total = 0.0
+        self.weight_total = 0.0
+        self.values = {}
+        self.recent = []
+
+    @classmethod
+    def from_grades(cls, grades):
+        stats = cls()
+        for grade in grades:
+            stats.add(grade)
+        return stats
+
+    @classmethod
+    def from_dict(cls, data):
+        # Agregaty zapisane razem z kursem; None, gdy wpis jest niekompletny
+        # albo policzony przy innych ustawieniach zapisu ocen
+        if data.get("notation") != notation_key():
+            return None
+        stats = cls()
+        try:
+            stats.count = int(data["count"])
+            stats.numeric_count = int(data["numeric_count"])
+            stats.total = float(data["total"])
+            stats.weighted_total = float(data["weighted_total"])
+            stats.weight_total = float(data["weight_total"])
+            stats.values = {float(value): int(n) for value, n in data["values"]}
+            stats.recent = [float(value) for value in data["recent"]][-TREND_WINDOW:]
+        except (KeyError, TypeError, ValueError):
+            return None
+        return stats
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "numeric_count": self.numeric_count,
+            "total": self.total,
+            "weighted_total": self.weighted_total,
+            "weight_total": self.weight_total,
+            "values": [[value, n] for value, n in sorted(self.values.items())],
+            "recent": list(self.recent),
+            "notation": notation_key()
+        }
+
+    def add(self, grade):
+        self.count += 1
+        if grade.numeric is None:
+            return
+        self.numeric_count += 1
+        self.total += grade.numeric
+        self.weighted_total += grade.numeric * grade.weight
+        self.weight_total += grade.weight
+        self.values[grade.numeric] = self.values.get(grade.numeric, 0) + 1
+        self.recent.append(grade.numeric)
+        if len(self.recent) > TREND_WINDOW:
+            del self.recent[0]
+
+    def remove(self, grade):
+        # Okno recent odświeża refresh_recent - usunięta ocena mogła być w środku listy
+        self.count -= 1
+        if grade.numeric is None:
+            return
+        self.numeric_count -= 1
+        self.total -= grade.numeric
+        self.weighted_total -= grade.numeric * grade.weight
+        self.weight_total -= grade.weight
+        remaining = self.values.get(grade.numeric, 0) - 1
+        if remaining > 0:
+            self.values[grade.numeric] = remaining
+        else:
+            self.values.pop(grade.numeric, None)
+
+    def refresh_recent(self, grades):
+        # Ostatnie oceny liczbowe od końca listy; zwykle przegląda tylko kilka ostatnich wpisów
+        recent = []
+        for grade in reversed(grades):
+            if grade.numeric is not None:
+                recent.append(grade.numeric)
+                if len(recent) == TREND_WINDOW:
+                    break
+        recent.reverse()
+        self.recent = recent
+
+    @property
+    def mean(self):
+        return self.total / self.numeric_count if self.numeric_count else None
+
+    @property
+    def weighted_mean(self):
+        return self.weighted_total / self.weight_total if self.weight_total else None
+
+    @property
+    def minimum(self):
+        return min(self.values) if self.values else None
+
+    @property
+    def maximum(self):
+        return max(self.values) if self.values else None
+
+    @property
+    def trend(self):
+        # Nachylenie prostej dopasowanej do ostatnich ocen (zmiana oceny na kolejną ocenę)
+        n = len(self.recent)
+        if n < 2:
+            return None
+        mean_x = (n - 1) / 2
+        mean_y = sum(self.recent) / n
+        numerator = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(self.recent))
+        denominator = sum((x - mean_x) ** 2 for x in range(n))
+        return numerator / denominator
+
+
+class Course:
+    # Kurs z polami sprawdzonymi przy tworzeniu; słowniki pojawiają się tylko przy zapisie i odczycie.
+    # Oceny kursu wczytanego leniwie (LazyCourse) są zamieniane na obiekty Grade przy pierwszym użyciu.
+    # Agregaty ocen (stats) są zapisywane z kursem, więc kurs leniwy nie musi parsować ocen do analizy.
+    __slots__ = ("id", "name", "_days", "days_mask", "lecturer", "max_absences", "current_absences",
+                 "mandatory", "_grades", "lazy_source", "stats")
+
+    def __init__(self, name, days=None, lecturer="", max_absences=0, current_absences=0,
+                 mandatory=False, grades=None, course_id=None):
+        self.id = course_id
+        self.name = str(name)
+        self.days = days or []
+        self.lecturer = str(lecturer or "")
+        self.max_absences = max(to_int(max_absences), 0)
+        self.current_absences = max(to_int(current_absences), 0)
+        self.mandatory = bool(mandatory)
+        self._grades = list(grades) if grades is not None else []
+        self.lazy_source = None
+        self.stats = GradeStats.from_grades(self._grades)
+
+    @property
+    def days(self):
+        return self._days
+
+    @days.setter
+    def days(self, days):
+        self._days = [day for day in days if isinstance(day, str)]
+        self.days_mask = days_to_mask(self._days)
+
+    @property
+    def grades(self):
+        if self.lazy_source is not None:
+            # Źródło jest zwalniane dopiero po udanym odczycie - uszkodzone oceny nie zamieniają się w pustą listę
+            self._grades = [Grade.from_dict(grade) for grade in self.lazy_source.get("grades", [])]
+            self.lazy_source = None
+        return self._grades
+
+    @grades.setter
+    def grades(self, grades):
+        self.lazy_source = None
+        self._grades = grades
+        self.stats = GradeStats.from_grades(grades)
+
+    def grades_loaded(self):
+        return self.lazy_source is None
+
+    def take_grades(self, other):
+        # Przejęcie ocen i agregatów innego kursu (edycja kursu) bez parsowania i przeliczania
+        self._grades = other._grades
+        self.lazy_source = other.lazy_source
+        self.stats = other.stats
+
+    def add_grade(self, grade):
+        self.grades.append(grade)
+        self.stats.add(grade)
+
+    def set_grade(self, index, grade):
+        grades = self.grades
+        old = grades[index]
+        grades[index] = grade
+        self.stats.remove(old)
+        self.stats.add(grade)
+        self.stats.refresh_recent(grades)
+
+    def remove_grade(self, index):
+        grades = self.grades
+        removed = grades.pop(index)
+        self.stats.remove(removed)
+        self.stats.refresh_recent(grades)
+        return removed
+
+    @classmethod
+    def from_dict(cls, data):
+        lazy = getattr(data, "raw_grades", None) is not None
+        course = cls(
+            data.get("name", "Unnamed Course"),
+            data.get("days", []),
+            data.get("lecturer", ""),
+            data.get("max_absences", 0),
+            data.get("current_absences", 0),
+            data.get("mandatory", False),
+            None if lazy else [Grade.from_dict(g) for g in data.get("grades", []) if isinstance(g, dict)],
+            data.get("id") if isinstance(data.get("id"), int) else None
+        )
+        if lazy:
+            course.lazy_source = data
+        stats = data.get("stats")
+        stats = GradeStats.from_dict(stats) if isinstance(stats, dict) else None
+        if stats is not None and (lazy or stats.count == len(course.grades)):
+            course.stats = stats
+        elif lazy:
+            course.stats = GradeStats.from_grades(course.grades)
+        return course
+
+    def header_dict(self):
+        # Pola kursu bez ocen (wpis "update_course" w dzienniku)
+        return {
+            "id": self.id,
+            "name": self.name,
+            "days": list(self.days),
+            "lecturer": self.lecturer,
+            "max_absences": self.max_absences,
+            "current_absences": self.current_absences,
+            "mandatory": self.mandatory
+        }
+
+    def to_dict(self):
+        data = self.header_dict()
+        data["grades"] = [grade.to_dict() for grade in self.grades]
+        data["stats"] = self.stats.to_dict()
+        return data
+
+    def __repr__(self):
+        return f"Course({self.name!r}, id={self.id})"
+
+
+class CourseRepository:
+    # Lista kursów z indeksem nazwa -> kurs i id -> pozycja, aktualizowanym przy każdej zmianie.
+    # Wszystkie widoki wyszukują kursy przez repozytorium, zawsze tak samo (bez rozróżniania wielkości liter).
+    def __init__(self, courses=None):
+        self.courses = []
+        self.by_name = {}
+        self.positions = {}  # id kursu -> pozycja na liście
+        self.by_day = [[] for _ in DAY_CODES]  # dzień -> pozycje kursów w kolejności listy
+        self.next_id = 1
+        if courses is not None:
+            self.load(courses)
+
+    def load(self, courses):
+        # Zwraca True, jeśli któryś kurs dostał nowe id (dane wymagają zapisu)
+        self.courses = courses
+        self.by_name = {}
+        self.positions = {}
+        self.by_day = [[] for _ in DAY_CODES]
+        ids = [c.id for c in courses if c.id is not None]
+        self.next_id = max(ids, default=0) + 1
+        assigned = False
+        for position, course in enumerate(courses):
+            if course.id is None or course.id in self.positions:
+                course.id = self.next_id
+                self.next_id += 1
+                assigned = True
+            self.index_course(position, course)
+        return assigned
+
+    def index_course(self, position, course):
+        self.positions[course.id] = position
+        self.index_days(position, 0, course.days_mask)
+        # Przy powtórzonych nazwach obowiązuje pierwszy kurs, jak w dotychczasowych pętlach
+        self.by_name.setdefault(name_key(course.name), course)
+
+    def index_days(self, position, old_mask, mask):
+        for day, bit in enumerate(DAY_BITS.values()):
+            if old_mask & bit and not mask & bit:
+                self.by_day[day].remove(position)
+            elif mask & bit and not old_mask & bit:
+                insort(self.by_day[day], position)
+
+    def courses_for_day(self, day):
+        # day: indeks dnia (0 = poniedziałek) albo kod dnia ("pon")
+        if isinstance(day, str):
+            day = DAY_CODES.index(day)
+        return [self.courses[position] for position in self.by_day[day]]
+
+    def __iter__(self):
+        return iter(self.courses)
+
+    def __len__(self):
+        return len(self.courses)
+
+    def find(self, name):
+        return self.by_name.get(name_key(name))
+
+    def get(self, course_id):
+        position = self.positions.get(course_id)
+        return None if position is None else self.courses[position]
+
+    def position(self, course):
+        return self.positions[course.id]
+
+    def add(self, course):
+        course.id = self.next_id
+        self.next_id += 1
+        self.courses.append(course)
+        self.index_course(len(self.courses) - 1, course)
+        return len(self.courses) - 1
+
+    def replace(self, position, course):
+        old = self.courses[position]
+        course.id = old.id
+        self.courses[position] = course
+        self.index_days(position, old.days_mask, course.days_mask)
+        old_key = name_key(old.name)
+        new_key = name_key(course.name)
+        if old_key == new_key:
+            if self.by_name.get(old_key) is old:
+                self.by_name[old_key] = course
+            return
+        # Zmiana nazwy: pod starą nazwą może kryć się inny kurs, a nowa może być już zajęta
+        for key in (old_key, new_key):
+            self.by_name.pop(key, None)
+            for other in self.courses:
+                if name_key(other.name) == key:
+                    self.by_name[key] = other
+                    break
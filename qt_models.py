@@ -0,0 +1,293 @@
+from bisect import bisect_left
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QAbstractTableModel, QModelIndex, QRect, QSize
+from PyQt5.QtGui import QColor, QFont, QPainter, QPalette
+from PyQt5.QtWidgets import QStyle, QStyledItemDelegate
+
+
+# Rola z identyfikatorem kursu (stabilny klucz, niezależny od pozycji i nazwy)
+COURSE_ID_ROLE = Qt.UserRole
+# Rola z kluczem sortowania kolumny ocen (QSortFilterProxyModel.setSortRole)
+SORT_ROLE = Qt.UserRole + 1
+# Rola z obiektem Course (rysowanie wiersza przez delegata)
+COURSE_ROLE = Qt.UserRole + 2
+
+# Liczba ocen dokładanych do widoku naraz (fetchMore) - pierwszy ekran nie czeka na całą historię
+GRADE_PAGE_SIZE = 200
+
+
+class CourseListModel(QAbstractListModel):
+    # Wspólny model listy kursów dla courses_list i course_combo. Zmiany kursów przechodzą przez model,
+    # który przekazuje je do repozytorium i powiadamia widoki tylko o zmienionym wierszu.
+    def __init__(self, repository, parent=None):
+        super().__init__(parent)
+        self.repository = repository
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.repository)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.repository):
+            return None
+        course = self.repository.courses[index.row()]
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return course.name
+        if role == COURSE_ID_ROLE:
+            return course.id
+        if role == Qt.ToolTipRole:
+            return course.lecturer or None
+        return None
+
+    def course_at(self, row):
+        if 0 <= row < len(self.repository):
+            return self.repository.courses[row]
+        return None
+
+    def row_of(self, course_id):
+        return self.repository.positions.get(course_id, -1)
+
+    def load(self, courses):
+        # Wczytanie całej listy (start aplikacji) - jedyne miejsce z pełnym przebudowaniem widoków
+        self.beginResetModel()
+        try:
+            return self.repository.load(courses)
+        finally:
+            self.endResetModel()
+
+    def add_course(self, course):
+        row = len(self.repository)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.repository.add(course)
+        self.endInsertRows()
+        return row
+
+    def replace_course(self, row, course):
+        self.repository.replace(row, course)
+        self.course_changed(row)
+
+    def course_changed(self, row):
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole, Qt.ToolTipRole])
+
+
+class GradeTableModel(QAbstractTableModel):
+    # Oceny wybranego kursu w kolumnach. Wiersze są udostępniane stronami przez canFetchMore/fetchMore,
+    # a zmiany ocen przechodzą przez model i odświeżają tylko dotknięty wiersz.
+    HEADERS = ["Ocena", "Notatka", "Data", "Wartość"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.course = None
+        self.loaded = 0  # Liczba wierszy udostępnionych widokom
+
+    def grades(self):
+        return self.course.grades if self.course is not None else []
+
+    def set_course(self, course):
+        self.beginResetModel()
+        self.course = course
+        self.loaded = min(GRADE_PAGE_SIZE, len(self.grades()))
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self.loaded:
+            return None
+        grade = self.grades()[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return grade.value
+            if column == 1:
+                return grade.note
+            if column == 2:
+                return grade.date
+            return "" if grade.numeric is None else f"{grade.numeric:g}"
+        if role == SORT_ROLE:
+            if column == 0 or column == 3:
+                # Oceny bez wartości liczbowej na końcu listy rosnącej
+                return float("inf") if grade.numeric is None else grade.numeric
+            if column == 1:
+                return grade.note.casefold()
+            return grade.date
+        if role == Qt.TextAlignmentRole and column == 3:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.loaded < len(self.grades())
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not parent.isValid():
+            self.fetch_rows(GRADE_PAGE_SIZE)
+
+    def fetch_all(self):
+        # Sortowanie obejmuje całą historię, nie tylko wczytane strony - reszta wierszy jednym wstawieniem
+        self.fetch_rows(len(self.grades()))
+
+    def fetch_rows(self, count):
+        count = min(count, len(self.grades()) - self.loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def add_grade(self, grade):
+        # Nowa ocena trafia na koniec; jeśli nie wszystkie strony są wczytane, pokaże ją fetchMore
+        row = len(self.grades())
+        if self.loaded == row:
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.course.add_grade(grade)
+            self.loaded += 1
+            self.endInsertRows()
+        else:
+            self.course.add_grade(grade)
+
+    def set_grade(self, row, grade):
+        self.course.set_grade(row, grade)
+        if row < self.loaded:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+
+    def remove_grade(self, row):
+        if row < self.loaded:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            removed = self.course.remove_grade(row)
+            self.loaded -= 1
+            self.endRemoveRows()
+        else:
+            removed = self.course.remove_grade(row)
+        return removed
+
+
+class TodayCoursesModel(QAbstractListModel):
+    # Kursy jednego dnia tygodnia według indeksu dni repozytorium. Model śledzi sygnały CourseListModel
+    # i dla każdej zmiany kursu wstawia, usuwa albo odświeża co najwyżej jeden wiersz.
+    def __init__(self, course_model, day, parent=None):
+        super().__init__(parent)
+        self.repository = course_model.repository
+        self.day = day
+        self.rows = list(self.repository.by_day[day])  # Pozycje kursów na liście repozytorium
+        course_model.modelReset.connect(self.reload)
+        course_model.rowsInserted.connect(lambda parent, first, last: self.courses_changed(first, last))
+        course_model.dataChanged.connect(lambda top, bottom, roles: self.courses_changed(top.row(), bottom.row()))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.rows):
+            return None
+        course = self.repository.courses[self.rows[index.row()]]
+        if role == Qt.DisplayRole:
+            return course.name
+        if role == COURSE_ID_ROLE:
+            return course.id
+        if role == COURSE_ROLE:
+            return course
+        return None
+
+    def set_day(self, day):
+        if day != self.day:
+            self.day = day
+            self.reload()
+
+    def reload(self):
+        self.beginResetModel()
+        self.rows = list(self.repository.by_day[self.day])
+        self.endResetModel()
+
+    def courses_changed(self, first, last):
+        for position in range(first, last + 1):
+            self.course_changed(position)
+
+    def course_changed(self, position):
+        # Pozycje w indeksie dni są posortowane - miejsce wiersza wyznacza wyszukiwanie binarne
+        row = bisect_left(self.rows, position)
+        shown = row < len(self.rows) and self.rows[row] == position
+        scheduled = self.repository.courses[position].days_mask >> self.day & 1
+        if shown and scheduled:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+        elif scheduled:
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.rows.insert(row, position)
+            self.endInsertRows()
+        elif shown:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.rows[row]
+            self.endRemoveRows()
+
+
+class TodayCourseDelegate(QStyledItemDelegate):
+    # Rysowanie wiersza kursu (nazwa, prowadzący, pasek nieobecności, oznaczenie obowiązkowego)
+    # bez tworzenia widżetów; widok rysuje tylko widoczne wiersze
+    ROW_HEIGHT = 62
+    MARGIN = 6
+    BAR_HEIGHT = 6
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        course = index.data(COURSE_ROLE)
+        if course is None:
+            return
+        painter.save()
+        rect = option.rect.adjusted(self.MARGIN, self.MARGIN // 2, -self.MARGIN, -self.MARGIN // 2)
+        text_color = option.palette.color(QPalette.Text)
+        if option.state & QStyle.State_MouseOver:
+            painter.fillRect(option.rect, option.palette.color(QPalette.AlternateBase))
+
+        # Oznaczenie przedmiotu obowiązkowego w prawym górnym rogu
+        name_font = QFont(option.font)
+        name_font.setBold(True)
+        line_height = option.fontMetrics.height()
+        badge_width = 0
+        if course.mandatory:
+            badge_text = "Obowiązkowy"
+            badge_width = option.fontMetrics.width(badge_text) + 12
+            badge = QRect(rect.right() - badge_width, rect.top(), badge_width, line_height + 2)
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor("#c0392b"))
+            painter.drawRoundedRect(badge, 4, 4)
+            painter.setPen(QColor("white"))
+            painter.drawText(badge, Qt.AlignCenter, badge_text)
+
+        painter.setPen(text_color)
+        painter.setFont(name_font)
+        name_rect = QRect(rect.left(), rect.top(), rect.width() - badge_width - self.MARGIN, line_height + 2)
+        painter.drawText(name_rect, Qt.AlignLeft | Qt.AlignVCenter,
+                         painter.fontMetrics().elidedText(course.name, Qt.ElideRight, name_rect.width()))
+
+        painter.setFont(option.font)
+        info_rect = QRect(rect.left(), name_rect.bottom() + 2, rect.width(), line_height)
+        absences = f"Nieobecności: {course.current_absences}/{course.max_absences}"
+        absences_width = option.fontMetrics.width(absences)
+        lecturer_rect = info_rect.adjusted(0, 0, -absences_width - self.MARGIN, 0)
+        painter.drawText(lecturer_rect, Qt.AlignLeft | Qt.AlignVCenter, option.fontMetrics.elidedText(
+            f"Prowadzący: {course.lecturer or 'Brak'}", Qt.ElideRight, lecturer_rect.width()))
+        painter.drawText(info_rect, Qt.AlignRight | Qt.AlignVCenter, absences)
+
+        # Pasek wykorzystania limitu nieobecności
+        bar = QRect(rect.left(), info_rect.bottom() + 4, rect.width(), self.BAR_HEIGHT)
+        ratio = min(course.current_absences / course.max_absences, 1.0) if course.max_absences > 0 else 0
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(0, 0, 0, 40))
+        painter.drawRect(bar)
+        if ratio > 0:
+            color = "#c0392b" if ratio > 0.8 else "#e67e22" if ratio > 0.5 else "#27ae60"
+            painter.setBrush(QColor(color))
+            painter.drawRect(QRect(bar.left(), bar.top(), round(bar.width() * ratio), bar.height()))
+        painter.restore()
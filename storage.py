@@ -0,0 +1,1116 @@
+import os
+import re
+import json
+import marshal
+import hashlib
+import logging
+import shutil
+import sqlite3
+import threading
+from json.decoder import scanstring
+from concurrent.futures import ThreadPoolExecutor
+
+from models import Grade, GradeStats
+
+
+def serialize_data(data):
+    return json.dumps(data, indent=4, ensure_ascii=False)
+
+
+def default_user_data():
+    # Profil nowego użytkownika - widoki odwołują się bezpośrednio do każdego z tych pól
+    return {"name": "", "profile_pic": "", "city": ""}
+
+
+BACKUP_GENERATIONS = 3
+
+
+def fsync_directory(path):
+    # Utrwalenie zmiany nazwy pliku w katalogu (niedostępne np. w Windows)
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_text(path, text):
+    # Zapis atomowy: plik tymczasowy + fsync + zmiana nazwy, przerwany zapis nie niszczy danych
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_directory(path)
+
+
+def backup_path_for(path, generation):
+    return f"{path}.bak{generation}"
+
+
+def rotate_backups(path, generations=BACKUP_GENERATIONS):
+    # path -> .bak1 -> .bak2 -> ... ; najstarsza generacja jest usuwana
+    if not os.path.exists(path) or generations < 1:
+        return
+    for generation in range(generations - 1, 0, -1):
+        older = backup_path_for(path, generation)
+        if os.path.exists(older):
+            os.replace(older, backup_path_for(path, generation + 1))
+    newest = backup_path_for(path, 1)
+    try:
+        # Dowiązanie zamiast kopii: bez przepisywania danych, a plik główny cały czas istnieje
+        os.link(path, newest)
+    except OSError:
+        shutil.copy2(path, newest)
+
+
+def write_snapshot_file(path, text, generations=BACKUP_GENERATIONS):
+    rotate_backups(path, generations)
+    write_text(path, text)
+
+
+def journal_path_for(path):
+    return path + ".journal"
+
+
+def cache_path_for(path):
+    return path + ".cache"
+
+
+CACHE_VERSION = 1
+
+
+def data_stamp(path):
+    # Rozmiar, czas modyfikacji i skrót pliku danych oraz dziennika
+    stamp = []
+    for file_path in (path, journal_path_for(path)):
+        if not os.path.exists(file_path):
+            stamp.append(None)
+            continue
+        with open(file_path, "rb") as f:
+            digest = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+        st = os.stat(file_path)
+        stamp.append([st.st_size, st.st_mtime_ns, digest])
+    return stamp
+
+
+def read_binary_cache(path):
+    # Zwalidowane dane z migawki binarnej albo None, gdy migawka nie odpowiada plikowi JSON.
+    # Nagłówek (wersja, wersja schematu, znacznik) jest czytany przed danymi, więc nieaktualna migawka kosztuje
+    # niewiele. Migawka sprzed zmiany schematu jest odrzucana - dane przejdą migracje przy wczytaniu z JSON.
+    cache_path = cache_path_for(path)
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, "rb") as f:
+            header = marshal.load(f)
+            if (header.get("version") != CACHE_VERSION or header.get("schema_version") != SCHEMA_VERSION
+                    or header.get("stamp") != data_stamp(path)):
+                return None
+            return marshal.load(f)
+    except (EOFError, ValueError, TypeError, AttributeError) as e:
+        logging.error(f"Uszkodzona migawka binarna {cache_path}: {e}")
+        return None
+
+
+def write_binary_cache(path, blob):
+    # blob to marshal.dumps(dane); znacznik liczony jest po zapisaniu pliku JSON i dziennika
+    header = marshal.dumps({"version": CACHE_VERSION, "schema_version": SCHEMA_VERSION, "stamp": data_stamp(path)})
+    cache_path = cache_path_for(path)
+    with open(cache_path + ".tmp", "wb") as f:
+        f.write(header + blob)
+    os.replace(cache_path + ".tmp", cache_path)
+
+
+def validate_grades(grades):
+    # Odrzucenie wpisów, które nie są słownikami, i uzupełnienie brakujących pól
+    validated_grades = []
+    for grade in grades:
+        if isinstance(grade, dict):
+            grade.setdefault("value", "")
+            grade.setdefault("note", "")
+            grade.setdefault("date", "")
+            validated_grades.append(grade)
+        else:
+            logging.error(f"Pominięto nieprawidłowy wpis oceny: {grade}")
+    return validated_grades
+
+
+class LazyCourse(dict):
+    # Kurs, którego lista ocen jest przechowywana jako surowy tekst JSON
+    # i parsowana dopiero przy pierwszym odwołaniu do "grades"
+    def __init__(self, *args, raw_grades=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.raw_grades = raw_grades
+
+    def grades_loaded(self):
+        return self.raw_grades is None
+
+    def load_grades(self):
+        # Uszkodzona lista ocen to błąd odczytu pliku (ValueError), a nie pusta lista - zapis pustej listy
+        # skasowałby historię ocen. Surowy tekst zostaje, więc każda kolejna próba kończy się tym samym błędem.
+        if self.raw_grades is not None:
+            try:
+                grades = json.loads(self.raw_grades)
+            except ValueError as e:
+                raise ValueError(f"Uszkodzona lista ocen kursu {dict.get(self, 'name')}: {e}") from e
+            if not isinstance(grades, list):
+                raise ValueError(f"Lista ocen kursu {dict.get(self, 'name')} nie jest tablicą")
+            dict.__setitem__(self, "grades", validate_grades(grades))
+            self.raw_grades = None
+
+    def __missing__(self, key):
+        if key == "grades" and self.raw_grades is not None:
+            self.load_grades()
+            return dict.__getitem__(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if key == "grades":
+            self.load_grades()
+        return dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        if key == "grades":
+            self.load_grades()
+        return dict.get(self, key, default)
+
+    def setdefault(self, key, default=None):
+        if key == "grades":
+            self.load_grades()
+        return dict.setdefault(self, key, default)
+
+    def pop(self, key, *default):
+        if key == "grades":
+            self.load_grades()
+        return dict.pop(self, key, *default)
+
+    def __setitem__(self, key, value):
+        if key == "grades":
+            self.raw_grades = None
+        dict.__setitem__(self, key, value)
+
+    # Operacje na całym słowniku (serializacja, kopiowanie) wymagają ocen
+    def items(self):
+        self.load_grades()
+        return dict.items(self)
+
+    def keys(self):
+        self.load_grades()
+        return dict.keys(self)
+
+    def values(self):
+        self.load_grades()
+        return dict.values(self)
+
+    def __iter__(self):
+        self.load_grades()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self.load_grades()
+        return dict.__len__(self)
+
+    def copy(self):
+        self.load_grades()
+        return dict(dict.items(self))
+
+
+def plain_data(data):
+    # Zamiana LazyCourse na zwykłe słowniki (np. dla marshal)
+    data = dict(data)
+    data["courses"] = [dict(course.items()) for course in data.get("courses", [])]
+    return data
+
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.S)
+STRUCTURAL = re.compile(r'[\[\]{}"]')
+
+
+class StreamingParser:
+    # Minimalny parser strumieniowy: przechodzi po członach obiektów i elementach tablic,
+    # pozwalając pominąć wartość (bez budowania obiektów) albo ją sparsować
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+
+    def skip_ws(self):
+        self.pos = WHITESPACE.match(self.text, self.pos).end()
+
+    def expect(self, char):
+        self.skip_ws()
+        if self.text[self.pos:self.pos + 1] != char:
+            raise ValueError(f"Oczekiwano '{char}' na pozycji {self.pos}")
+        self.pos += 1
+
+    def peek(self):
+        self.skip_ws()
+        return self.text[self.pos:self.pos + 1]
+
+    def members(self):
+        # Generator kluczy obiektu; wywołujący musi skonsumować wartość przed kolejnym krokiem
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            self.skip_ws()
+            key, self.pos = scanstring(self.text, self.pos + 1)
+            self.expect(":")
+            self.skip_ws()
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def elements(self):
+        # Generator elementów tablicy; analogicznie do members
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            self.skip_ws()
+            yield self.pos
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("]")
+            return
+
+    def value(self):
+        value, self.pos = self.decoder.raw_decode(self.text, self.pos)
+        return value
+
+    def skip(self):
+        # Pominięcie wartości bez parsowania, zwraca jej surowy tekst
+        start = self.pos
+        if self.text[start] not in "[{":
+            self.value()
+            return self.text[start:self.pos]
+        depth = 0
+        pos = start
+        while True:
+            match = STRUCTURAL.search(self.text, pos)
+            if match is None:
+                raise ValueError("Niezakończona tablica lub obiekt")
+            char = match.group()
+            pos = match.start()
+            if char == '"':
+                pos = STRING.match(self.text, pos).end()
+                continue
+            depth += 1 if char in "[{" else -1
+            pos += 1
+            if depth == 0:
+                self.pos = pos
+                return self.text[start:pos]
+
+
+def iter_lazy_courses(parser):
+    # Kolejne kursy z nagłówkami sparsowanymi od razu i ocenami odłożonymi na później
+    for _ in parser.elements():
+        if parser.peek() != "{":
+            yield parser.value()  # Nieprawidłowy wpis, odrzuci go walidacja
+            continue
+        course = LazyCourse()
+        for key in parser.members():
+            if key == "grades":
+                course.raw_grades = parser.skip()
+            else:
+                dict.__setitem__(course, key, parser.value())
+        yield course
+
+
+def load_streaming(path):
+    # Jak json.load, ale kursy są typu LazyCourse (oceny parsowane przy pierwszym użyciu)
+    with open(path, "r", encoding='utf-8') as f:
+        parser = StreamingParser(f.read())
+    data = {}
+    for key in parser.members():
+        if key == "courses" and parser.peek() == "[":
+            data["courses"] = [course for course in iter_lazy_courses(parser)]
+        else:
+            data[key] = parser.value()
+    return data
+
+
+SCHEMA_VERSION = 3
+
+
+def migrate_v1_legacy_shapes(data):
+    # Pliki z app.py/appv2.py: dni jako tekst "pon, śr", oceny jako lista napisów, brak user_data
+    data.setdefault("user_data", {"name": "", "profile_pic": "", "city": ""})
+    for course in data.get("courses", []):
+        if not isinstance(course, dict):
+            continue
+        if isinstance(course.get("days"), str):
+            course["days"] = [d.strip() for d in course["days"].split(",") if d.strip()]
+        grades = course.get("grades")
+        if isinstance(grades, list):
+            course["grades"] = [
+                {"value": str(grade), "note": "", "date": ""} if isinstance(grade, (str, int, float)) else grade
+                for grade in grades
+            ]
+
+
+def migrate_v2_course_defaults(data):
+    # Pliki z appv3.py..appv7.py: brakujące pola kursów i ocen, nieprawidłowe wpisy
+    courses = []
+    for course in data.get("courses", []):
+        if not isinstance(course, dict):
+            logging.error(f"Pominięto nieprawidłowy wpis kursu: {course}")
+            continue
+        course.setdefault("name", "Unnamed Course")
+        course.setdefault("days", [])
+        course.setdefault("lecturer", "")
+        course.setdefault("max_absences", 0)
+        course.setdefault("current_absences", 0)
+        course.setdefault("mandatory", False)
+        course["grades"] = validate_grades(course.get("grades", []))
+        courses.append(course)
+    data["courses"] = courses
+    data.setdefault("style", "Windows XP")
+
+
+def migrate_v3_course_ids(data):
+    # Stałe identyfikatory kursów (nazwa może się zmieniać wielkością liter)
+    used = {c["id"] for c in data.get("courses", []) if isinstance(c.get("id"), int)}
+    next_id = max(used, default=0) + 1
+    for course in data.get("courses", []):
+        if not isinstance(course.get("id"), int):
+            course["id"] = next_id
+            next_id += 1
+
+
+# Kolejne migracje: (wersja docelowa, funkcja). Plik w wersji N przechodzi tylko migracje > N.
+MIGRATIONS = [
+    (1, migrate_v1_legacy_shapes),
+    (2, migrate_v2_course_defaults),
+    (3, migrate_v3_course_ids)
+]
+
+
+def migrate_data(data):
+    # Zwraca True, jeśli dane wymagały migracji (i powinny zostać zapisane)
+    version = data.get("schema_version", 0)
+    if version >= SCHEMA_VERSION:
+        return False
+    for target, migration in MIGRATIONS:
+        if version < target:
+            migration(data)
+            logging.info(f"Migracja danych do wersji {target}")
+    data["schema_version"] = SCHEMA_VERSION
+    return True
+
+
+def apply_mutation(data, entry):
+    # Odtworzenie pojedynczej zmiany z dziennika na słowniku danych
+    op = entry["op"]
+    courses = data.setdefault("courses", [])
+    if op == "set_user":
+        data.setdefault("user_data", default_user_data())[entry["key"]] = entry["value"]
+    elif op == "set_style":
+        data["style"] = entry["value"]
+        data.setdefault("user_data", default_user_data())["style"] = entry["value"]
+    elif op == "add_course":
+        courses.append(entry["course"])
+    elif op == "update_course":
+        courses[entry["course"]].update(entry["fields"])
+    elif op == "add_grade":
+        courses[entry["course"]].setdefault("grades", []).append(entry["grade"])
+    elif op == "edit_grade":
+        courses[entry["course"]]["grades"][entry["index"]] = entry["grade"]
+    elif op == "remove_grade":
+        courses[entry["course"]]["grades"].pop(entry["index"])
+    else:
+        raise ValueError(f"Nieznana operacja w dzienniku: {op}")
+    if op in ("add_grade", "edit_grade", "remove_grade"):
+        # Zapisane agregaty ocen są nieaktualne - przelicza je kompaktacja albo wczytanie kursu
+        courses[entry["course"]].pop("stats", None)
+
+
+def refresh_stats(data):
+    # Agregaty kursów usunięte przy odtwarzaniu zmian ocen, liczone od nowa przed zapisem migawki -
+    # bez nich kurs wczytany leniwie musiałby parsować wszystkie oceny już przy starcie
+    for course in data.get("courses", []):
+        if isinstance(course, dict) and "stats" not in course and isinstance(course.get("grades"), list):
+            grades = [Grade.from_dict(grade) for grade in course["grades"] if isinstance(grade, dict)]
+            course["stats"] = GradeStats.from_grades(grades).to_dict()
+
+
+def read_journal(journal_path):
+    # Niekompletna ostatnia linia (przerwany zapis) jest pomijana
+    entries = []
+    if not os.path.exists(journal_path):
+        return entries
+    with open(journal_path, "r", encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                logging.error(f"Pominięto uszkodzony wpis dziennika: {line[:80]}")
+    return entries
+
+
+def trim_journal(journal_path):
+    # Obcięcie niekompletnej ostatniej linii (przerwany zapis) przed dopisywaniem kolejnych zmian -
+    # nowy wpis doklejony do fragmentu zginąłby razem z nim przy odczycie. Zwraca rozmiar dziennika.
+    if not os.path.exists(journal_path):
+        return 0
+    with open(journal_path, "rb+") as f:
+        content = f.read()
+        size = content.rfind(b"\n") + 1
+        if size < len(content):
+            logging.warning(f"Obcięto niekompletny wpis dziennika: {content[size:size + 80]!r}")
+            f.truncate(size)
+            f.flush()
+            os.fsync(f.fileno())
+    return size
+
+
+def read_snapshot(path, lazy=False):
+    # Migawka z pliku głównego, a gdy jest uszkodzona - z najnowszej poprawnej kopii zapasowej.
+    # Zwraca (dane, ścieżka odczytanego pliku albo None, gdy nie ma żadnego).
+    candidates = [path] + [backup_path_for(path, g) for g in range(1, BACKUP_GENERATIONS + 1)]
+    errors = []
+    for candidate in candidates:
+        if not os.path.exists(candidate):
+            continue
+        try:
+            if lazy:
+                data = load_streaming(candidate)
+            else:
+                with open(candidate, "r", encoding='utf-8') as f:
+                    data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("Migawka nie jest obiektem JSON")
+        except (ValueError, IndexError, UnicodeDecodeError) as e:
+            logging.error(f"Uszkodzony plik danych {candidate}: {e}")
+            errors.append(e)
+            continue
+        if candidate != path:
+            logging.warning(f"Odtworzono dane z kopii zapasowej: {candidate}")
+        return data, candidate
+    if errors:
+        raise errors[0]
+    return {}, None
+
+
+class JournalGapError(ValueError):
+    # Dziennik zapisany względem nowszej migawki niż odczytana kopia zapasowa - zmiany pomiędzy nimi
+    # przepadły, a wpisy pozycyjne (indeks kursu, indeks oceny) trafiłyby w inne miejsca.
+    # data: migawka z kopii zapasowej bez odtworzonych zmian.
+    def __init__(self, message, data):
+        super().__init__(message)
+        self.data = data
+
+
+def load_with_journal(path, lazy=False):
+    # Ostatnia migawka + zmiany z dziennika, których migawka jeszcze nie zawiera.
+    # Zwraca (dane, numer ostatniej zmiany, liczba odtworzonych zmian).
+    data, source = read_snapshot(path, lazy)
+    if not data:
+        # Sam dziennik bez migawki (przerwane pierwsze uruchomienie) - wpisy mają już bieżący kształt
+        data = {"courses": [], "user_data": default_user_data(), "style": "Windows XP",
+                "journal_seq": 0, "schema_version": SCHEMA_VERSION}
+    elif isinstance(data.get("user_data"), dict):
+        data["user_data"] = {**default_user_data(), **data["user_data"]}
+    seq = data.get("journal_seq", 0)
+    # Wpisy o numerze nie większym niż journal_seq są już zawarte w migawce (przerwana kompaktacja)
+    entries = [entry for entry in read_journal(journal_path_for(path)) if entry.get("seq", 0) > seq]
+    if source not in (None, path) and entries and entries[0].get("seq") != seq + 1:
+        raise JournalGapError(
+            f"Dziennik zaczyna się od zmiany {entries[0].get('seq')}, a kopia zapasowa {source} "
+            f"kończy się na zmianie {seq} - zmiany z dziennika nie zostały odtworzone", data)
+    replayed = 0
+    for entry in entries:
+        try:
+            apply_mutation(data, entry)
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            logging.error(f"Błąd odtwarzania wpisu dziennika {entry}: {e}")
+        seq = entry.get("seq", seq)
+        replayed += 1
+    data["journal_seq"] = seq
+    return data, seq, replayed
+
+
+class BackgroundWriter:
+    # Zapis w tle. Zadania wykonywane są po kolei: dopisanie zmian do dziennika,
+    # pełna migawka albo kompaktacja (złożenie dziennika w nową migawkę).
+    # Nowa migawka zastępuje wszystkie oczekujące zadania, bo zawiera już ich zmiany.
+    def __init__(self, path, compact_threshold=256 * 1024):
+        self.path = path
+        self.journal_path = journal_path_for(path)
+        self.compact_threshold = compact_threshold
+        self.journal_size = trim_journal(self.journal_path)
+        self.tasks = []  # [rodzaj, dane]: "snapshot" (tekst), "append" (lista linii), "compact", "cache", "close"
+        self.writing = False
+        self.closed = False
+        self.last_error = None
+        self.submitted = 0
+        self.written = 0
+        self.compactions = 0
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="course-data-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, text):
+        with self.condition:
+            self.tasks = [["snapshot", text]]
+            self.submitted += 1
+            self.condition.notify_all()
+
+    def append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False)
+        with self.condition:
+            if self.tasks and self.tasks[-1][0] == "append":
+                self.tasks[-1][1].append(line)
+            else:
+                self.tasks.append(["append", [line]])
+            self.submitted += 1
+            self.condition.notify_all()
+
+    def save_cache(self, data):
+        # Migawka binarna dla szybkiego startu, zapisywana po wszystkich oczekujących zapisach
+        blob = marshal.dumps(plain_data(data))
+        with self.condition:
+            self.tasks.append(["cache", blob])
+            self.condition.notify_all()
+
+    def compact(self):
+        with self.condition:
+            if not any(kind == "compact" for kind, _ in self.tasks):
+                self.tasks.append(["compact", None])
+                self.condition.notify_all()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.tasks and not self.closed:
+                    self.condition.wait()
+                if not self.tasks:
+                    return
+                kind, payload = self.tasks.pop(0)
+                self.writing = True
+            try:
+                if kind == "snapshot":
+                    self.write_snapshot(payload)
+                elif kind == "append":
+                    self.write_journal(payload)
+                elif kind == "compact":
+                    self.run_compaction()
+                elif kind == "cache":
+                    self.write_cache(payload)
+                else:
+                    self.close_files()
+                self.last_error = None
+                self.written += 1
+            except Exception as e:
+                logging.error(f"Błąd zapisu danych w tle ({kind}): {e}")
+                self.last_error = e
+            finally:
+                with self.condition:
+                    self.writing = False
+                    self.condition.notify_all()
+
+    def write_snapshot(self, text):
+        write_snapshot_file(self.path, text)
+        # Migawka zawiera wszystkie zmiany z dziennika
+        write_text(self.journal_path, "")
+        self.journal_size = 0
+
+    def set_aside_journal(self):
+        # Dziennik, którego nie da się odtworzyć (JournalGapError), jest przenoszony obok, żeby kolejne
+        # zmiany nie dostały powtórzonych numerów; kompaktacja nie składa go już w migawkę
+        self.flush()
+        with self.condition:
+            if os.path.exists(self.journal_path):
+                orphan_path = self.journal_path + ".orphan"
+                with open(self.journal_path, "r", encoding='utf-8') as f:
+                    text = f.read()
+                with open(orphan_path, "a", encoding='utf-8') as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                write_text(self.journal_path, "")
+                logging.warning(f"Dziennik bez zgodnej migawki przeniesiono do {orphan_path}")
+            self.journal_size = 0
+
+    def write_journal(self, lines):
+        text = "\n".join(lines) + "\n"
+        with open(self.journal_path, "a", encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_size += len(text.encode("utf-8"))
+        if self.journal_size > self.compact_threshold:
+            self.compact()
+
+    def run_compaction(self):
+        if not self.journal_size:
+            return
+        data, seq, replayed = load_with_journal(self.path)
+        refresh_stats(data)
+        self.write_snapshot(serialize_data(data))
+        self.compactions += 1
+        logging.info(f"Kompaktacja dziennika: {replayed} zmian złożonych w migawkę (seq {seq})")
+
+    def write_cache(self, blob):
+        write_binary_cache(self.path, blob)
+
+    def close_files(self):
+        pass
+
+    def flush(self, timeout=None):
+        # Czeka, aż wszystkie zlecone zapisy trafią na dysk; zwraca False po przekroczeniu czasu
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.tasks and not self.writing, timeout)
+
+    def close(self, timeout=None):
+        self.flush(timeout)
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    lecturer TEXT NOT NULL DEFAULT '',
+    max_absences INTEGER NOT NULL DEFAULT 0,
+    current_absences INTEGER NOT NULL DEFAULT 0,
+    mandatory INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS course_days (
+    course_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+    day TEXT NOT NULL,
+    PRIMARY KEY (course_id, day)
+);
+CREATE TABLE IF NOT EXISTS grades (
+    id INTEGER PRIMARY KEY,
+    course_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    value TEXT NOT NULL DEFAULT '',
+    note TEXT NOT NULL DEFAULT '',
+    date TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_courses_name ON courses (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_course_days_day ON course_days (day);
+CREATE INDEX IF NOT EXISTS idx_grades_course ON grades (course_id, position);
+CREATE INDEX IF NOT EXISTS idx_grades_date ON grades (date);
+"""
+
+
+def connect_sqlite(path):
+    connection = sqlite3.connect(path)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA foreign_keys=ON")
+    connection.executescript(SQLITE_SCHEMA)
+    return connection
+
+
+def course_from_row(row, days):
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "days": days,
+        "lecturer": row["lecturer"],
+        "max_absences": row["max_absences"],
+        "current_absences": row["current_absences"],
+        "mandatory": bool(row["mandatory"])
+    }
+
+
+def grade_from_row(row):
+    return {"value": row["value"], "note": row["note"], "date": row["date"]}
+
+
+class SqliteStore:
+    # Operacje na bazie SQLite odpowiadające wpisom dziennika: każda zmiana dotyka pojedynczych wierszy
+    DAY_ORDER = ["pon", "wt", "śr", "czw", "pt", "sob", "niedz"]
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = connect_sqlite(path)
+        if self.connection.execute("SELECT 1 FROM meta LIMIT 1").fetchone() is None:
+            self.init_meta()
+
+    def init_meta(self):
+        # Nowa baza: pełny profil i bieżąca wersja schematu, żeby pierwsze wpisy dziennika (np. set_style)
+        # nie zostawiły profilu bez pól, a baza nie wyglądała na dane sprzed wersjonowania
+        with self.connection:
+            self.set_meta("user_data", default_user_data())
+            self.set_meta("style", "Windows XP")
+            self.set_meta("journal_seq", 0)
+            self.set_meta("schema_version", SCHEMA_VERSION)
+
+    def close(self):
+        self.connection.close()
+
+    def load(self):
+        # Zwraca dane w tym samym kształcie co course_data.json
+        db = self.connection
+        meta = {row["key"]: json.loads(row["value"]) for row in db.execute("SELECT key, value FROM meta")}
+        days = {}
+        for row in db.execute("SELECT course_id, day FROM course_days"):
+            days.setdefault(row["course_id"], []).append(row["day"])
+        grades = {}
+        for row in db.execute("SELECT course_id, value, note, date FROM grades ORDER BY course_id, position"):
+            grades.setdefault(row["course_id"], []).append(grade_from_row(row))
+        courses = []
+        for row in db.execute("SELECT * FROM courses ORDER BY position"):
+            course = course_from_row(row, self.sorted_days(days.get(row["id"], [])))
+            course["grades"] = grades.get(row["id"], [])
+            courses.append(course)
+        return {
+            "courses": courses,
+            "user_data": {**default_user_data(), **meta.get("user_data", {})},
+            "style": meta.get("style", "Windows XP"),
+            "journal_seq": meta.get("journal_seq", 0),
+            # Wersja zapisanych danych; baza bez wpisu (sprzed wersjonowania) przechodzi migracje przy wczytaniu
+            "schema_version": meta.get("schema_version", 0)
+        }
+
+    def sorted_days(self, days):
+        return sorted(days, key=lambda day: self.DAY_ORDER.index(day) if day in self.DAY_ORDER else len(self.DAY_ORDER))
+
+    def course_id(self, position):
+        row = self.connection.execute("SELECT id FROM courses WHERE position = ?", (position,)).fetchone()
+        if row is None:
+            raise IndexError(f"Brak kursu na pozycji {position}")
+        return row["id"]
+
+    def grade_id(self, course_id, index):
+        row = self.connection.execute(
+            "SELECT id FROM grades WHERE course_id = ? ORDER BY position LIMIT 1 OFFSET ?", (course_id, index)
+        ).fetchone()
+        if row is None:
+            raise IndexError(f"Brak oceny o indeksie {index}")
+        return row["id"]
+
+    def set_meta(self, key, value):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value, ensure_ascii=False))
+        )
+
+    def insert_course(self, position, course):
+        # id kursu z danych jest kluczem wiersza (NULL - nadawany przez SQLite).
+        # Dane muszą być po migrate_data - starsze kształty (oceny jako tekst) są odrzucane, a nie gubione.
+        if not isinstance(course.get("grades", []), list) or any(
+                not isinstance(grade, dict) for grade in course.get("grades", [])):
+            raise ValueError(f"Nieprawidłowe oceny kursu {course.get('name')}: wymagana lista słowników")
+        course_id = course.get("id") if isinstance(course.get("id"), int) else None
+        cursor = self.connection.execute(
+            "INSERT INTO courses (id, position, name, lecturer, max_absences, current_absences, mandatory) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (course_id, position, course.get("name", ""), course.get("lecturer", ""), course.get("max_absences", 0),
+             course.get("current_absences", 0), int(bool(course.get("mandatory", False))))
+        )
+        course_id = cursor.lastrowid
+        self.set_days(course_id, course.get("days", []))
+        self.connection.executemany(
+            "INSERT INTO grades (course_id, position, value, note, date) VALUES (?, ?, ?, ?, ?)",
+            [(course_id, i, grade.get("value", ""), grade.get("note", ""), grade.get("date", ""))
+             for i, grade in enumerate(course.get("grades", []))]
+        )
+
+    def set_days(self, course_id, days):
+        if isinstance(days, str):
+            # Dawny zapis "pon, śr" byłby rozbity na pojedyncze znaki
+            raise ValueError(f"Nieprawidłowe dni kursu: {days!r} (wymagana lista kodów dni)")
+        self.connection.execute("DELETE FROM course_days WHERE course_id = ?", (course_id,))
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO course_days (course_id, day) VALUES (?, ?)", [(course_id, day) for day in days]
+        )
+
+    def replace_all(self, data):
+        with self.connection:
+            self.connection.execute("DELETE FROM grades")
+            self.connection.execute("DELETE FROM course_days")
+            self.connection.execute("DELETE FROM courses")
+            self.connection.execute("DELETE FROM meta")
+            for position, course in enumerate(data.get("courses", [])):
+                self.insert_course(position, course)
+            self.set_meta("user_data", data.get("user_data", {}))
+            self.set_meta("style", data.get("style", "Windows XP"))
+            self.set_meta("journal_seq", data.get("journal_seq", 0))
+            self.set_meta("schema_version", data.get("schema_version", 0))
+
+    def apply(self, entries):
+        # Wpisy dziennika (te same co w apply_mutation) zapisywane w jednej transakcji
+        with self.connection:
+            for entry in entries:
+                self.apply_entry(entry)
+            if entries:
+                self.set_meta("journal_seq", entries[-1].get("seq", 0))
+
+    def apply_entry(self, entry):
+        db = self.connection
+        op = entry["op"]
+        if op == "set_user":
+            row = db.execute("SELECT value FROM meta WHERE key = 'user_data'").fetchone()
+            user_data = {**default_user_data(), **(json.loads(row["value"]) if row else {})}
+            user_data[entry["key"]] = entry["value"]
+            self.set_meta("user_data", user_data)
+        elif op == "set_style":
+            self.set_meta("style", entry["value"])
+            self.apply_entry({"op": "set_user", "key": "style", "value": entry["value"]})
+        elif op == "add_course":
+            position = db.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM courses").fetchone()[0]
+            self.insert_course(position, entry["course"])
+        elif op == "update_course":
+            course_id = self.course_id(entry["course"])
+            fields = entry["fields"]
+            columns = [column for column in ("name", "lecturer", "max_absences", "current_absences", "mandatory")
+                       if column in fields]
+            if columns:
+                values = [int(fields[c]) if c == "mandatory" else fields[c] for c in columns]
+                db.execute(
+                    f"UPDATE courses SET {', '.join(c + ' = ?' for c in columns)} WHERE id = ?", values + [course_id]
+                )
+            if "days" in fields:
+                self.set_days(course_id, fields["days"])
+        elif op == "add_grade":
+            course_id = self.course_id(entry["course"])
+            position = db.execute(
+                "SELECT COALESCE(MAX(position) + 1, 0) FROM grades WHERE course_id = ?", (course_id,)
+            ).fetchone()[0]
+            grade = entry["grade"]
+            db.execute(
+                "INSERT INTO grades (course_id, position, value, note, date) VALUES (?, ?, ?, ?, ?)",
+                (course_id, position, grade.get("value", ""), grade.get("note", ""), grade.get("date", ""))
+            )
+        elif op == "edit_grade":
+            grade_id = self.grade_id(self.course_id(entry["course"]), entry["index"])
+            grade = entry["grade"]
+            db.execute(
+                "UPDATE grades SET value = ?, note = ?, date = ? WHERE id = ?",
+                (grade.get("value", ""), grade.get("note", ""), grade.get("date", ""), grade_id)
+            )
+        elif op == "remove_grade":
+            # Luki w pozycjach są dopuszczalne, liczy się tylko kolejność
+            db.execute("DELETE FROM grades WHERE id = ?", (self.grade_id(self.course_id(entry["course"]), entry["index"]),))
+        else:
+            raise ValueError(f"Nieznana operacja w dzienniku: {op}")
+
+    def courses_for_day(self, day):
+        rows = self.connection.execute(
+            "SELECT c.*, (SELECT GROUP_CONCAT(day) FROM course_days WHERE course_id = c.id) AS all_days "
+            "FROM courses c JOIN course_days d ON d.course_id = c.id WHERE d.day = ? ORDER BY c.position",
+            (day,)
+        ).fetchall()
+        return [course_from_row(row, self.sorted_days(row["all_days"].split(","))) for row in rows]
+
+    def grades_for_course(self, name):
+        rows = self.connection.execute(
+            "SELECT g.value, g.note, g.date FROM grades g JOIN courses c ON c.id = g.course_id "
+            "WHERE c.name = ? COLLATE NOCASE ORDER BY g.position",
+            (name,)
+        ).fetchall()
+        return [grade_from_row(row) for row in rows]
+
+
+def migrate_json_to_sqlite(json_path, db_path):
+    # Jednorazowe przeniesienie danych z course_data.json (wraz z dziennikiem) do bazy SQLite
+    data, seq, replayed = load_with_journal(json_path)
+    migrate_data(data)  # Dawne kształty (dni jako tekst, oceny jako napisy) przed zapisem do tabel
+    store = SqliteStore(db_path)
+    try:
+        store.replace_all(data)
+    finally:
+        store.close()
+    logging.info(f"Przeniesiono dane do {db_path}: {len(data.get('courses', []))} kursów")
+    return data
+
+
+def load_sqlite(path):
+    store = SqliteStore(path)
+    try:
+        data = store.load()
+    finally:
+        store.close()
+    return data, data["journal_seq"], 0
+
+
+class SqliteWriter(BackgroundWriter):
+    # Ten sam interfejs co BackgroundWriter, ale zmiany trafiają do bazy SQLite jako operacje na wierszach.
+    # Połączenie tworzone jest w wątku zapisu, bo obiekty sqlite3 są związane z wątkiem.
+    def __init__(self, path):
+        self.store = None
+        super().__init__(path)
+
+    def open_store(self):
+        if self.store is None:
+            self.store = SqliteStore(self.path)
+        return self.store
+
+    def write_snapshot(self, text):
+        self.open_store().replace_all(json.loads(text))
+
+    def write_journal(self, lines):
+        self.open_store().apply([json.loads(line) for line in lines])
+
+    def run_compaction(self):
+        pass
+
+    def write_cache(self, blob):
+        pass  # Baza SQLite nie wymaga parsowania przy starcie
+
+    def close_files(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def close(self, timeout=None):
+        self.flush(timeout)
+        # Zamknięcie połączenia jako ostatnie zadanie wątku zapisu
+        with self.condition:
+            self.tasks.append(["close", None])
+            self.condition.notify_all()
+        super().close(timeout)
+
+
+class ShardedStore:
+    # Układ na dysku: manifest.json (user_data, styl, kolejność kursów) + jeden plik na kurs w courses/
+    def __init__(self, directory):
+        self.directory = directory
+        self.courses_dir = os.path.join(directory, "courses")
+        self.manifest_path = os.path.join(directory, "manifest.json")
+
+    def shard_path(self, shard_id):
+        return os.path.join(self.courses_dir, f"{shard_id}.json")
+
+    def read_shard(self, shard_id):
+        with open(self.shard_path(shard_id), "r", encoding='utf-8') as f:
+            return json.load(f)
+
+    def load(self, workers=4):
+        # Zwraca (dane, identyfikatory plików kursów w kolejności); kursy czytane równolegle
+        with open(self.manifest_path, "r", encoding='utf-8') as f:
+            manifest = json.load(f)
+        shard_ids = manifest.get("courses", [])
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            courses = list(pool.map(self.read_shard, shard_ids))
+        data = {
+            "courses": courses,
+            "user_data": manifest.get("user_data", {"name": "", "profile_pic": "", "city": ""}),
+            "style": manifest.get("style", "Windows XP"),
+            "journal_seq": manifest.get("journal_seq", 0),
+            "schema_version": manifest.get("schema_version", 0)
+        }
+        return data, shard_ids
+
+    def new_shard_id(self, shard_ids):
+        return f"{max((int(i) for i in shard_ids), default=0) + 1:04d}"
+
+    def write_course(self, shard_id, course):
+        write_text(self.shard_path(shard_id), serialize_data(course))
+
+    def write_manifest(self, data, shard_ids):
+        manifest = {
+            "courses": shard_ids,
+            "user_data": data.get("user_data", {}),
+            "style": data.get("style", "Windows XP"),
+            "journal_seq": data.get("journal_seq", 0),
+            "schema_version": data.get("schema_version", 0)
+        }
+        write_text(self.manifest_path, serialize_data(manifest))
+
+    def replace_all(self, data):
+        os.makedirs(self.courses_dir, exist_ok=True)
+        shard_ids = [f"{i + 1:04d}" for i in range(len(data.get("courses", [])))]
+        for shard_id, course in zip(shard_ids, data.get("courses", [])):
+            self.write_course(shard_id, course)
+        # Manifest na końcu: do tego momentu obowiązuje poprzedni stan
+        self.write_manifest(data, shard_ids)
+        for name in os.listdir(self.courses_dir):
+            if name.endswith(".json") and name[:-5] not in shard_ids:
+                os.remove(os.path.join(self.courses_dir, name))
+        return shard_ids
+
+
+def migrate_json_to_sharded(json_path, directory):
+    data, seq, replayed = load_with_journal(json_path)
+    ShardedStore(directory).replace_all(data)
+    logging.info(f"Przeniesiono dane do {directory}: {len(data.get('courses', []))} kursów")
+    return data
+
+
+def load_sharded(directory):
+    data, _ = ShardedStore(directory).load()
+    return data, data["journal_seq"], 0
+
+
+class ShardedWriter(BackgroundWriter):
+    # Zmiany z dziennika są nakładane na kopię danych w wątku zapisu,
+    # a na dysk trafiają tylko pliki kursów, których dotyczyły, oraz mały manifest z numerem ostatniej zmiany
+    def __init__(self, directory):
+        self.store = ShardedStore(directory)
+        self.mirror = None
+        self.shard_ids = None
+        super().__init__(directory)
+
+    def ensure_mirror(self):
+        if self.mirror is None:
+            if not os.path.exists(self.store.manifest_path):
+                # Pierwsze uruchomienie: pusty magazyn, żeby zmiany z dziennika miały do czego trafić
+                self.write_snapshot(serialize_data({
+                    "courses": [],
+                    "user_data": {"name": "", "profile_pic": "", "city": ""},
+                    "style": "Windows XP",
+                    "journal_seq": 0,
+                    "schema_version": SCHEMA_VERSION
+                }))
+                logging.info(f"Utworzono pusty magazyn kursów w {self.store.directory}")
+            else:
+                self.mirror, self.shard_ids = self.store.load()
+
+    def write_snapshot(self, text):
+        data = json.loads(text)
+        self.shard_ids = self.store.replace_all(data)
+        self.mirror = data
+
+    def write_journal(self, lines):
+        self.ensure_mirror()
+        dirty = set()
+        for line in lines:
+            entry = json.loads(line)
+            apply_mutation(self.mirror, entry)
+            self.mirror["journal_seq"] = entry.get("seq", self.mirror.get("journal_seq", 0))
+            if entry["op"] == "add_course":
+                self.shard_ids.append(self.store.new_shard_id(self.shard_ids))
+                dirty.add(len(self.shard_ids) - 1)
+            elif entry["op"] not in ("set_user", "set_style"):
+                dirty.add(entry["course"])
+        for index in sorted(dirty):
+            self.store.write_course(self.shard_ids[index], self.mirror["courses"][index])
+        # Manifest po każdej partii: journal_seq nie może zostać w tyle (np. przy samych zmianach ocen)
+        self.store.write_manifest(self.mirror, self.shard_ids)
+
+    def run_compaction(self):
+        pass
+
+    def write_cache(self, blob):
+        pass
@@ -0,0 +1,407 @@
+import os
+import copy
+import json
+import time
+import random
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from collections import OrderedDict
+
+
+def normalize_city(city):
+    # "  wrocław " i "Wrocław" to to samo miasto
+    return " ".join(city.split()).casefold()
+
+
+def is_current_weather(data):
+    # Odpowiedź, którą da się wyświetlić: temperatura i co najmniej jeden opis pogody
+    try:
+        return isinstance(data["main"]["temp"], (int, float)) and "description" in data["weather"][0]
+    except (KeyError, IndexError, TypeError):
+        return False
+
+
+class WeatherCache:
+    # Pamięć podręczna odpowiedzi pogodowych na dysku, kluczem jest znormalizowana nazwa miasta.
+    # Wpisy starsze niż ttl są "nieświeże" - nadal zwracane, ale wymagają odświeżenia w tle.
+    def __init__(self, path="weather_cache.json", ttl=None, max_entries=20):
+        self.path = path
+        if ttl is None:
+            ttl = int(os.getenv("WEATHER_CACHE_TTL", "600"))
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # klucz -> {"data": ..., "fetched_at": ...}, od najdawniej używanego
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding='utf-8') as f:
+                stored = json.load(f)
+            for key, entry in stored.items():
+                if isinstance(entry, dict) and "data" in entry and "fetched_at" in entry:
+                    self.entries[key] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            logging.info(f"Wczytano pamięć podręczną pogody: {len(self.entries)} wpisów")
+        except Exception as e:
+            logging.error(f"Błąd wczytywania pamięci podręcznej pogody: {e}")
+            self.entries = OrderedDict()
+
+    def save(self):
+        try:
+            # Serializacja pod blokadą (put z innego wątku nie zmieni wpisów w trakcie), zapis atomowy poza nią.
+            # save_lock utrzymuje kolejność zapisów - starsza migawka nie nadpisze nowszej.
+            with self.save_lock:
+                with self.lock:
+                    text = json.dumps(self.entries, ensure_ascii=False)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w", encoding='utf-8') as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.error(f"Błąd zapisu pamięci podręcznej pogody: {e}")
+
+    def get(self, city):
+        # Zwraca (dane, czy_świeże) albo (None, False) gdy brak wpisu
+        key = normalize_city(city)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None, False
+            self.entries.move_to_end(key)
+        fresh = time.time() - entry["fetched_at"] < self.ttl
+        return entry["data"], fresh
+
+    def get_entry(self, city):
+        # Surowy wpis {"data", "fetched_at"} bez zmiany kolejności LRU
+        with self.lock:
+            return self.entries.get(normalize_city(city))
+
+    def put(self, city, data):
+        key = normalize_city(city)
+        with self.lock:
+            self.entries[key] = {"data": data, "fetched_at": time.time()}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                evicted, _ = self.entries.popitem(last=False)
+                logging.info(f"Usunięto z pamięci podręcznej pogody: {evicted}")
+        self.save()
+
+    def discard(self, city):
+        with self.lock:
+            removed = self.entries.pop(normalize_city(city), None)
+        if removed is not None:
+            self.save()
+
+
+class CircuitOpenError(Exception):
+    # Zgłaszany, gdy obwód jest otwarty i żądanie nie zostało nawet wysłane
+    pass
+
+
+class CircuitBreaker:
+    # Po failure_threshold kolejnych awariach blokuje żądania na cooldown sekund,
+    # potem przepuszcza jedno żądanie próbne (stan półotwarty)
+    def __init__(self, failure_threshold=3, cooldown=60):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                return "half-open"
+            return "open"
+
+    def allow_request(self):
+        return self.state() != "open"
+
+    def record_success(self):
+        with self.lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logging.warning(f"Obwód pogody otwarty po {self.consecutive_failures} awariach")
+                self.opened_at = time.monotonic()  # Nieudana próba w stanie półotwartym wydłuża blokadę
+
+
+class WeatherProviderError(Exception):
+    # Błąd transportu (brak połączenia, przekroczony czas, odpowiedź inna niż JSON) - żądanie warto ponowić
+    pass
+
+
+class OpenWeatherMapProvider:
+    # Dostawca HTTP zgodny z API OpenWeatherMap; ten sam kod obsługuje lokalny serwer zastępczy
+    BASE_URL = "http://api.openweathermap.org/data/2.5"
+
+    def __init__(self, base_url=None, api_key=None, timeout=5):
+        self.base_url = base_url or self.BASE_URL
+        self.api_key = api_key or os.getenv("OPENWEATHERMAP_API_KEY", "dda747e2109d0a5935b8f8f418d84b41")
+        self.timeout = timeout
+        # Współdzielona sesja: keep-alive i pula połączeń zamiast nowego połączenia TCP przy każdym żądaniu
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, endpoint, params):
+        # Zwraca (kod HTTP, dane JSON)
+        params = dict(params, appid=self.api_key, units="metric", lang="pl")
+        try:
+            response = self.session.get(f"{self.base_url}/{endpoint}", params=params, timeout=self.timeout)
+            return response.status_code, response.json()
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise WeatherProviderError(str(e))
+        except ValueError:
+            # Treść inna niż JSON (np. strona logowania do sieci Wi-Fi) to awaria, nawet przy kodzie 200
+            raise WeatherProviderError(f"Nieprawidłowa odpowiedź serwera (HTTP {response.status_code})")
+
+    def close(self):
+        self.session.close()
+
+
+class FakeWeatherProvider:
+    # Dostawca działający w procesie, odtwarzający nagrane odpowiedzi OpenWeatherMap
+    # z konfigurowalnym opóźnieniem i odsetkiem błędów (testy obciążeniowe, praca bez sieci)
+    def __init__(self, fixtures_path="weather_fixtures.json", latency=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        with open(fixtures_path, "r", encoding='utf-8') as f:
+            fixtures = json.load(f)
+        # Klucz "*" to odpowiedź domyślna dla miast spoza nagrań
+        self.recorded = {normalize_city(city): data for city, data in fixtures.get("weather", {}).items()}
+
+    def recorded_weather(self, city):
+        key = normalize_city(city)
+        data = self.recorded.get(key) or self.recorded.get("*")
+        if data is None:
+            return None
+        data = copy.deepcopy(data)
+        if key not in self.recorded:
+            data["name"] = city
+        data["dt"] = int(time.time())
+        return data
+
+    def forecast(self, current):
+        # Prognoza budowana z nagranej pogody bieżącej, przesunięta na najbliższe 5 dni co 3 godziny
+        # (nagrana prognoza miałaby nieaktualne daty)
+        start = int(time.time()) // 10800 * 10800 + 10800
+        entries = []
+        for i in range(40):
+            entry = {
+                "dt": start + i * 10800,
+                "main": copy.deepcopy(current.get("main", {})),
+                "weather": copy.deepcopy(current.get("weather", []))
+            }
+            hour = time.gmtime(entry["dt"] + current.get("timezone", 0)).tm_hour
+            # Cieplej w środku dnia, chłodniej w nocy
+            entry["main"]["temp"] = round(current.get("main", {}).get("temp", 10) + (2 if 9 <= hour <= 15 else -2), 2)
+            entry["dt_txt"] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(entry["dt"]))
+            entries.append(entry)
+        return {
+            "cod": "200",
+            "cnt": len(entries),
+            "list": entries,
+            "city": {"name": current.get("name", ""), "timezone": current.get("timezone", 0)}
+        }
+
+    def get(self, endpoint, params):
+        with self.lock:
+            failed = self.random.random() < self.error_rate
+            roll = self.random.random()
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            # Połowa awarii to zerwane połączenie, reszta to błąd serwera
+            if roll < 0.5:
+                raise WeatherProviderError("Symulowany błąd połączenia")
+            return 503, {"cod": 503, "message": "Symulowany błąd serwera"}
+
+        current = self.recorded_weather(params.get("q", ""))
+        if current is None:
+            return 404, {"cod": "404", "message": "city not found"}
+        if endpoint == "weather":
+            return 200, current
+        if endpoint == "forecast":
+            return 200, self.forecast(current)
+        return 404, {"cod": "404", "message": "Internal error"}
+
+    def close(self):
+        pass
+
+
+def create_provider():
+    # Wybór dostawcy przez zmienne środowiskowe:
+    # WEATHER_PROVIDER=openweathermap (domyślnie) | local | fake
+    name = os.getenv("WEATHER_PROVIDER", "openweathermap").lower()
+    latency = float(os.getenv("WEATHER_FAKE_LATENCY", "0"))
+    error_rate = float(os.getenv("WEATHER_FAKE_ERROR_RATE", "0"))
+    if name == "fake":
+        return FakeWeatherProvider(latency=latency, error_rate=error_rate)
+    if name == "local":
+        return OpenWeatherMapProvider(os.getenv("WEATHER_BASE_URL", "http://127.0.0.1:8765/data/2.5"))
+    return OpenWeatherMapProvider()
+
+
+class WeatherClient:
+    # Klient pogodowy nad wymiennym dostawcą, z ograniczoną liczbą ponowień i wyłącznikiem obwodu
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, cache=None, provider=None, max_retries=2, backoff=0.5, breaker=None):
+        self.cache = cache
+        self.provider = provider or create_provider()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = {
+            "hits": 0,  # świeże trafienia w pamięci podręcznej
+            "stale_hits": 0,
+            "misses": 0,
+            "requests": 0,  # faktycznie wysłane żądania (z ponowieniami)
+            "retries": 0,
+            "failures": 0,
+            "short_circuited": 0
+        }
+        self.stats_lock = threading.Lock()
+
+    def count(self, name):
+        with self.stats_lock:
+            self.stats[name] += 1
+
+    def get_stats(self):
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats["circuit"] = self.breaker.state()
+        return stats
+
+    def cached(self, city):
+        # Odczyt z pamięci podręcznej ze zliczaniem trafień
+        if self.cache is None:
+            self.count("misses")
+            return None, False
+        data, fresh = self.cache.get(city)
+        if data is None:
+            self.count("misses")
+        elif fresh:
+            self.count("hits")
+        else:
+            self.count("stale_hits")
+        return data, fresh
+
+    def request(self, endpoint, params):
+        # Zwraca (kod HTTP, dane JSON); błędy sieci i 5xx są ponawiane z wykładniczym opóźnieniem
+        if not self.breaker.allow_request():
+            self.count("short_circuited")
+            raise CircuitOpenError("Serwis pogodowy chwilowo niedostępny")
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.count("retries")
+                time.sleep(self.backoff * (2 ** (attempt - 1)))
+            self.count("requests")
+            try:
+                status_code, data = self.provider.get(endpoint, params)
+            except WeatherProviderError as e:
+                last_error = e
+                continue
+            if status_code in self.RETRY_STATUSES:
+                last_error = WeatherProviderError(f"HTTP {status_code}")
+                continue
+            self.breaker.record_success()
+            return status_code, data
+
+        self.count("failures")
+        self.breaker.record_failure()
+        raise last_error
+
+    def fetch_current(self, city):
+        status_code, data = self.request("weather", {"q": city})
+        if status_code == 200 and self.cache is not None and is_current_weather(data):
+            self.cache.put(city, data)
+        return status_code, data
+
+    def close(self):
+        self.provider.close()
+
+
+class ForecastPrefetcher:
+    # Jedno żądanie o prognozę 5-dniową (co 3 godziny) zastępuje osobne zapytania dla każdego dnia.
+    # Prognoza jest indeksowana po dacie lokalnej miasta i odpytywana już tylko z pamięci.
+    def __init__(self, client, cache=None):
+        self.client = client
+        if cache is None:
+            cache = WeatherCache("forecast_cache.json", ttl=int(os.getenv("FORECAST_CACHE_TTL", "10800")), max_entries=5)
+        self.cache = cache
+        self.indexes = {}  # klucz miasta -> (znacznik pobrania, {data: [wpisy]})
+        self.lock = threading.Lock()
+
+    def needs_refresh(self, city):
+        _, fresh = self.cache.get(city)
+        return not fresh
+
+    def prefetch(self, city):
+        # Wywoływane w wątku roboczym; zwraca (kod HTTP, dane JSON)
+        status_code, data = self.client.request("forecast", {"q": city})
+        if status_code == 200:
+            self.cache.put(city, data)
+        return status_code, data
+
+    def index(self, city):
+        entry = self.cache.get_entry(city)
+        if entry is None:
+            return {}
+        data = entry["data"]
+        key = normalize_city(city)
+        stamp = entry["fetched_at"]
+        with self.lock:
+            cached = self.indexes.get(key)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+
+        by_date = {}
+        offset = data.get("city", {}).get("timezone", 0)
+        for entry in data.get("list", []):
+            try:
+                local = time.gmtime(entry["dt"] + offset)
+            except (KeyError, TypeError):
+                continue
+            by_date.setdefault(time.strftime("%Y-%m-%d", local), []).append((local.tm_hour, entry))
+        with self.lock:
+            self.indexes[key] = (stamp, by_date)
+        return by_date
+
+    def weather_for(self, city, date):
+        # Prognoza na dany dzień ("yyyy-MM-dd") w formacie odpowiedzi /weather albo None.
+        # Reprezentatywny jest wpis najbliższy południa.
+        entries = self.index(city).get(date)
+        if not entries:
+            return None
+        _, entry = min(entries, key=lambda item: abs(item[0] - 12))
+        return {
+            "weather": entry.get("weather", []),
+            "main": entry.get("main", {}),
+            "dt": entry.get("dt")
+        }
+
+    def available_dates(self, city):
+        return sorted(self.index(city))
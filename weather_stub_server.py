@@ -0,0 +1,62 @@
+import sys
+import json
+import logging
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from weather import FakeWeatherProvider, WeatherProviderError
+
+# Lokalny serwer zastępczy dla API OpenWeatherMap (praca bez dostępu do sieci, testy obciążeniowe).
+# Uruchomienie: python weather_stub_server.py --port 8765 --latency 0.5 --error-rate 0.2
+# Aplikacja: WEATHER_PROVIDER=local python appv8final.py
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class WeatherStubHandler(BaseHTTPRequestHandler):
+    provider = None
+    protocol_version = "HTTP/1.1"  # keep-alive, tak jak prawdziwe API
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        try:
+            status_code, data = self.provider.get(endpoint, params)
+        except WeatherProviderError:
+            # Zerwanie połączenia bez odpowiedzi
+            self.close_connection = True
+            return
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.info(f"{self.address_string()} - {format % args}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lokalny serwer zastępczy OpenWeatherMap")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default="weather_fixtures.json")
+    parser.add_argument("--latency", type=float, default=0.0, help="opóźnienie odpowiedzi w sekundach")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="odsetek błędnych odpowiedzi (0-1)")
+    args = parser.parse_args(argv)
+
+    WeatherStubHandler.provider = FakeWeatherProvider(args.fixtures, args.latency, args.error_rate)
+    server = ThreadingHTTPServer((args.host, args.port), WeatherStubHandler)
+    logging.info(f"Serwer pogody na http://{args.host}:{args.port}/data/2.5 (opóźnienie: {args.latency}s, błędy: {args.error_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())